@@ -7,7 +7,7 @@
 # Your Own Computer Games with Python", chapter 15:
 #   http://inventwithpython.com/chapter15.html
 
-import random, sys, pygame, time, copy
+import random, sys, pygame, time
 from pygame.locals import *
 
 FPS = 10 # frames per second to update the screen
@@ -21,6 +21,78 @@ BLACK_TILE = 'BLACK_TILE' # an arbitrary but unique value
 EMPTY_SPACE = 'EMPTY_SPACE' # an arbitrary but unique value
 HINT_TILE = 'HINT_TILE' # an arbitrary but unique value
 ANIMATIONSPEED = 25 # integer from 1 to 100, higher is faster animation
+DEBUGCHECKS = False # if True, check the board's tracked scores and moves by recounting after every move
+
+GREEDY = 'greedy' # always flips the most tiles, even when it could take a corner
+EASY = 'easy' # takes a corner if it can, otherwise flips the most tiles
+HARD = 'hard' # looks ahead with an alpha-beta search, much harder to beat
+COMPUTERLEVEL = HARD # how the computer player picks its moves
+THINKTIME = 1000 # how many milliseconds the HARD computer may think about each move
+MAXDEPTH = 8 # the most moves ahead the HARD computer looks, or None for no limit
+ENDGAMEEMPTIES = 10 # with this many empty spaces or fewer, the HARD computer plays perfectly
+ENDGAMETIME = 3000 # how many milliseconds it may take to do that before thinking normally
+FASTESTFIRSTEMPTIES = 6 # with more empty spaces than this, the endgame solver sorts moves fastest-first
+
+# The board data structure is a dictionary of bitboards: one integer for
+# each kind of tile, where bit (y * BOARDWIDTH + x) is set if that tile is
+# at space x, y. This lets all the valid moves and the tiles a move flips
+# be worked out with a few bit shifts instead of looking at each space.
+# The board also keeps each player's score and valid moves up to date as
+# moves are made, so drawing the score and checking for valid moves every
+# frame doesn't have to work them out again.
+FULLBITS = (1 << (BOARDWIDTH * BOARDHEIGHT)) - 1 # every space on the board
+LEFTCOLUMNBITS = sum([1 << (y * BOARDWIDTH) for y in range(BOARDHEIGHT)])
+RIGHTCOLUMNBITS = LEFTCOLUMNBITS << (BOARDWIDTH - 1)
+# How far to shift the bits to move one space in each of the eight
+# directions, and which bits are left afterwards. Moving left or right off
+# the edge of a row wraps around into the next row, so those are masked off.
+DIRECTIONS = [(1, FULLBITS & ~LEFTCOLUMNBITS),                # right
+              (-1, FULLBITS & ~RIGHTCOLUMNBITS),              # left
+              (BOARDWIDTH, FULLBITS),                         # down
+              (-BOARDWIDTH, FULLBITS),                        # up
+              (BOARDWIDTH + 1, FULLBITS & ~LEFTCOLUMNBITS),   # down right
+              (-BOARDWIDTH + 1, FULLBITS & ~LEFTCOLUMNBITS),  # up right
+              (BOARDWIDTH - 1, FULLBITS & ~RIGHTCOLUMNBITS),  # down left
+              (-BOARDWIDTH - 1, FULLBITS & ~RIGHTCOLUMNBITS)] # up left
+# How many times getFillBits() doubles its step to cross the longest line
+# of tiles there can be between two others.
+FILLSTEPS = (max(BOARDWIDTH, BOARDHEIGHT) - 2).bit_length()
+
+# Bits of special spaces for the HARD computer. Corners can never be
+# flipped. The X squares diagonally next to a corner, and the C squares next
+# to a corner along the edge, often give the corner away to the other player.
+TOPLEFT = 1
+TOPRIGHT = 1 << (BOARDWIDTH - 1)
+BOTTOMLEFT = 1 << (BOARDWIDTH * (BOARDHEIGHT - 1))
+BOTTOMRIGHT = 1 << (BOARDWIDTH * BOARDHEIGHT - 1)
+CORNERBITS = TOPLEFT | TOPRIGHT | BOTTOMLEFT | BOTTOMRIGHT
+TOPROWBITS = (1 << BOARDWIDTH) - 1
+BOTTOMROWBITS = TOPROWBITS << (BOARDWIDTH * (BOARDHEIGHT - 1))
+EDGEBITS = LEFTCOLUMNBITS | RIGHTCOLUMNBITS | TOPROWBITS | BOTTOMROWBITS
+# each corner with its X square, and the edges (direction and line mask)
+# running away from it
+CORNERS = [(TOPLEFT, TOPLEFT << (BOARDWIDTH + 1), [(1, TOPROWBITS), (BOARDWIDTH, LEFTCOLUMNBITS)]),
+           (TOPRIGHT, TOPRIGHT << (BOARDWIDTH - 1), [(-1, TOPROWBITS), (BOARDWIDTH, RIGHTCOLUMNBITS)]),
+           (BOTTOMLEFT, BOTTOMLEFT >> (BOARDWIDTH - 1), [(1, BOTTOMROWBITS), (-BOARDWIDTH, LEFTCOLUMNBITS)]),
+           (BOTTOMRIGHT, BOTTOMRIGHT >> (BOARDWIDTH + 1), [(-1, BOTTOMROWBITS), (-BOARDWIDTH, RIGHTCOLUMNBITS)])]
+XSQUAREBITS = sum([xSquare for corner, xSquare, edges in CORNERS])
+CSQUAREBITS = ((CORNERBITS << 1) | (CORNERBITS >> 1) | (CORNERBITS << BOARDWIDTH) | (CORNERBITS >> BOARDWIDTH)) & EDGEBITS & ~CORNERBITS
+# The search tries moves in this order, best kinds of spaces first, so that
+# alpha-beta pruning can skip more of the bad moves.
+MOVEORDER = [CORNERBITS, EDGEBITS & ~CORNERBITS & ~CSQUAREBITS,
+             FULLBITS & ~EDGEBITS & ~XSQUAREBITS, CSQUAREBITS, XSQUAREBITS]
+WINSCORE = 10000 # larger than any score evaluateBits() can give
+# The board split into four quadrants. Near the end of the game, moving in a
+# quadrant with an odd number of empty spaces tends to let you have the
+# last move there (parity), so the endgame solver tries those moves first.
+QUADRANTS = [sum([1 << (y * BOARDWIDTH + x) for x in range(BOARDWIDTH) for y in range(BOARDHEIGHT)
+                  if (x >= BOARDWIDTH // 2) == right and (y >= BOARDHEIGHT // 2) == bottom])
+             for right in (False, True) for bottom in (False, True)]
+
+# Keeps track of the search in progress, so it can stop when it runs out of
+# time. Afterwards it holds how deep the last search got and how many
+# positions (nodes) it looked at.
+SEARCH = {'deadline': None, 'stopped': False, 'nodes': 0, 'depth': 0}
 
 # Amount of space on the left & right side (XMARGIN) or above and below
 # (YMARGIN) the game board, in pixels.
@@ -40,9 +112,14 @@ GRIDLINECOLOR = BLACK
 TEXTCOLOR = WHITE
 HINTCOLOR = BROWN
 
+# What drawBoard() and drawInfo() last drew on the screen, so they only need
+# to draw what changed. None means everything needs to be drawn.
+DRAWNBOARD = None
+DRAWNINFO = None
+
 
 def main():
-    global MAINCLOCK, DISPLAYSURF, FONT, BIGFONT, BGIMAGE
+    global MAINCLOCK, DISPLAYSURF, FONT, BIGFONT, BGIMAGE, TILEIMAGES
 
     pygame.init()
     MAINCLOCK = pygame.time.Clock()
@@ -61,6 +138,16 @@ def main():
     # Use smoothscale() to stretch the background image to fit the entire window:
     BGIMAGE = pygame.transform.smoothscale(BGIMAGE, (WINDOWWIDTH, WINDOWHEIGHT))
     BGIMAGE.blit(boardImage, boardImageRect)
+    drawGridLines(BGIMAGE) # the grid never changes, so draw it on the background once
+    BGIMAGE = BGIMAGE.convert()
+
+    # Draw the tiles and hint spot once, so drawing the board just copies them.
+    TILEIMAGES = {}
+    for tile, color in ((WHITE_TILE, WHITE), (BLACK_TILE, BLACK)):
+        TILEIMAGES[tile] = pygame.Surface((SPACESIZE, SPACESIZE), SRCALPHA)
+        pygame.draw.circle(TILEIMAGES[tile], color, (int(SPACESIZE / 2), int(SPACESIZE / 2)), int(SPACESIZE / 2) - 4)
+    TILEIMAGES[HINT_TILE] = pygame.Surface((SPACESIZE, SPACESIZE), SRCALPHA)
+    pygame.draw.rect(TILEIMAGES[HINT_TILE], HINTCOLOR, (int(SPACESIZE / 2) - 4, int(SPACESIZE / 2) - 4, 8, 8))
 
     # Run the main game.
     while True:
@@ -78,8 +165,10 @@ def runGame():
     turn = random.choice(['computer', 'player'])
 
     # Draw the starting board and ask the player what color they want.
+    redrawEverything()
     drawBoard(mainBoard)
     playerTile, computerTile = enterPlayerTile()
+    redrawEverything() # the question was drawn over the board
 
     # Make the Surface and Rect objects for the "New Game" and "Hints" buttons
     newGameSurf = FONT.render('New Game', True, TEXTCOLOR, TEXTBGCOLOR2)
@@ -123,16 +212,17 @@ def runGame():
                         if movexy != None and not isValidMove(mainBoard, playerTile, movexy[0], movexy[1]):
                             movexy = None
 
-                # Draw the game board.
-                drawBoard(boardToDraw)
-                drawInfo(boardToDraw, playerTile, computerTile, turn)
+                # Draw the game board, and only update the parts of the
+                # window that changed.
+                changedRects = drawBoard(boardToDraw)
+                changedRects.extend(drawInfo(boardToDraw, playerTile, computerTile, turn))
 
                 # Draw the "New Game" and "Hints" buttons.
                 DISPLAYSURF.blit(newGameSurf, newGameRect)
                 DISPLAYSURF.blit(hintsSurf, hintsRect)
 
                 MAINCLOCK.tick(FPS)
-                pygame.display.update()
+                pygame.display.update(changedRects)
 
             # Make the move and end the turn.
             makeMove(mainBoard, playerTile, movexy[0], movexy[1], True)
@@ -148,20 +238,24 @@ def runGame():
                 break
 
             # Draw the board.
-            drawBoard(mainBoard)
-            drawInfo(mainBoard, playerTile, computerTile, turn)
+            changedRects = drawBoard(mainBoard)
+            changedRects.extend(drawInfo(mainBoard, playerTile, computerTile, turn))
 
             # Draw the "New Game" and "Hints" buttons.
             DISPLAYSURF.blit(newGameSurf, newGameRect)
             DISPLAYSURF.blit(hintsSurf, hintsRect)
+            pygame.display.update(changedRects)
 
             # Make it look like the computer is thinking by pausing a bit.
+            # Time spent really thinking counts toward the pause, so the
+            # HARD computer doesn't pause on top of its search.
             pauseUntil = time.time() + random.randint(5, 15) * 0.1
+            x, y = getComputerMove(mainBoard, computerTile)
             while time.time() < pauseUntil:
-                pygame.display.update()
+                checkForQuit()
+                MAINCLOCK.tick(FPS)
 
             # Make the move and end the turn.
-            x, y = getComputerMove(mainBoard, computerTile)
             makeMove(mainBoard, computerTile, x, y, True)
             if getValidMoves(mainBoard, playerTile) != []:
                 # Only set for the player's turn if they can make a move.
@@ -169,6 +263,7 @@ def runGame():
 
     # Display the final score.
     drawBoard(mainBoard)
+    pygame.display.update()
     scores = getScoreOfBoard(mainBoard)
 
     # Determine the text of the message to display.
@@ -215,7 +310,7 @@ def runGame():
         DISPLAYSURF.blit(text2Surf, text2Rect)
         DISPLAYSURF.blit(yesSurf, yesRect)
         DISPLAYSURF.blit(noSurf, noRect)
-        pygame.display.update()
+        pygame.display.update([textRect, text2Rect, yesRect, noRect])
         MAINCLOCK.tick(FPS)
 
 
@@ -232,7 +327,10 @@ def animateTileChange(tilesToFlip, tileColor, additionalTile):
         additionalTileColor = BLACK
     additionalTileX, additionalTileY = translateBoardToPixelCoord(additionalTile[0], additionalTile[1])
     pygame.draw.circle(DISPLAYSURF, additionalTileColor, (additionalTileX, additionalTileY), int(SPACESIZE / 2) - 4)
-    pygame.display.update()
+    pygame.display.update(getSpaceRect(additionalTile[0], additionalTile[1]))
+
+    # Only the spaces of the flipping tiles change during the animation.
+    flipRects = [getSpaceRect(x, y) for x, y in tilesToFlip]
 
     for rgbValues in range(0, 255, int(ANIMATIONSPEED * 2.55)):
         if rgbValues > 255:
@@ -248,15 +346,48 @@ def animateTileChange(tilesToFlip, tileColor, additionalTile):
         for x, y in tilesToFlip:
             centerx, centery = translateBoardToPixelCoord(x, y)
             pygame.draw.circle(DISPLAYSURF, color, (centerx, centery), int(SPACESIZE / 2) - 4)
-        pygame.display.update()
+        pygame.display.update(flipRects)
         MAINCLOCK.tick(FPS)
         checkForQuit()
 
 
 def drawBoard(board):
-    # Draw background of board.
-    DISPLAYSURF.blit(BGIMAGE, BGIMAGE.get_rect())
-
+    # Draws the tiles and hint spots that changed since the board was last
+    # drawn, and returns a list of the Rects of the window that changed.
+    global DRAWNBOARD
+    if DRAWNBOARD == None:
+        # Draw everything: the background (which has the grid lines)...
+        DISPLAYSURF.blit(BGIMAGE, BGIMAGE.get_rect())
+        DRAWNBOARD = {WHITE_TILE: 0, BLACK_TILE: 0, HINT_TILE: 0}
+        changedRects = [DISPLAYSURF.get_rect()]
+    else:
+        changedRects = []
+
+    # ...and the black & white tiles or hint spots that are different from
+    # what is on the screen now.
+    changedBits = 0
+    for tile in (WHITE_TILE, BLACK_TILE, HINT_TILE):
+        changedBits |= board[tile] ^ DRAWNBOARD[tile]
+    for x, y in getSpacesOfBits(changedBits):
+        spaceRect = getSpaceRect(x, y)
+        DISPLAYSURF.blit(BGIMAGE, spaceRect, spaceRect) # erase what was there
+        tile = getTileAt(board, x, y)
+        if tile != EMPTY_SPACE:
+            DISPLAYSURF.blit(TILEIMAGES[tile], (XMARGIN + x * SPACESIZE, YMARGIN + y * SPACESIZE))
+        changedRects.append(spaceRect)
+    DRAWNBOARD = {WHITE_TILE: board[WHITE_TILE], BLACK_TILE: board[BLACK_TILE], HINT_TILE: board[HINT_TILE]}
+    return changedRects
+
+
+def redrawEverything():
+    # Makes the next drawBoard() and drawInfo() calls draw the whole window,
+    # for when something else has been drawn over it.
+    global DRAWNBOARD, DRAWNINFO
+    DRAWNBOARD = None
+    DRAWNINFO = None
+
+
+def drawGridLines(surface):
     # Draw grid lines of the board.
     for x in range(BOARDWIDTH + 1):
         # Draw the horizontal lines.
@@ -264,27 +395,20 @@ def drawBoard(board):
         starty = YMARGIN
         endx = (x * SPACESIZE) + XMARGIN
         endy = YMARGIN + (BOARDHEIGHT * SPACESIZE)
-        pygame.draw.line(DISPLAYSURF, GRIDLINECOLOR, (startx, starty), (endx, endy))
+        pygame.draw.line(surface, GRIDLINECOLOR, (startx, starty), (endx, endy))
     for y in range(BOARDHEIGHT + 1):
         # Draw the vertical lines.
         startx = XMARGIN
         starty = (y * SPACESIZE) + YMARGIN
         endx = XMARGIN + (BOARDWIDTH * SPACESIZE)
         endy = (y * SPACESIZE) + YMARGIN
-        pygame.draw.line(DISPLAYSURF, GRIDLINECOLOR, (startx, starty), (endx, endy))
+        pygame.draw.line(surface, GRIDLINECOLOR, (startx, starty), (endx, endy))
 
-    # Draw the black & white tiles or hint spots.
-    for x in range(BOARDWIDTH):
-        for y in range(BOARDHEIGHT):
-            centerx, centery = translateBoardToPixelCoord(x, y)
-            if board[x][y] == WHITE_TILE or board[x][y] == BLACK_TILE:
-                if board[x][y] == WHITE_TILE:
-                    tileColor = WHITE
-                else:
-                    tileColor = BLACK
-                pygame.draw.circle(DISPLAYSURF, tileColor, (centerx, centery), int(SPACESIZE / 2) - 4)
-            if board[x][y] == HINT_TILE:
-                pygame.draw.rect(DISPLAYSURF, HINTCOLOR, (centerx - 4, centery - 4, 8, 8))
+
+def getSpaceRect(x, y):
+    # Returns the Rect of the inside of the board space, leaving out the
+    # grid lines around it.
+    return pygame.Rect(XMARGIN + x * SPACESIZE + 1, YMARGIN + y * SPACESIZE + 1, SPACESIZE - 1, SPACESIZE - 1)
 
 
 def getSpaceClicked(mousex, mousey):
@@ -301,83 +425,177 @@ def getSpaceClicked(mousex, mousey):
 
 
 def drawInfo(board, playerTile, computerTile, turn):
-    # Draws scores and whose turn it is at the bottom of the screen.
+    # Draws scores and whose turn it is at the bottom of the screen, if they
+    # changed since they were last drawn. Returns a list of the Rects of the
+    # window that changed.
+    global DRAWNINFO
     scores = getScoreOfBoard(board)
-    scoreSurf = FONT.render("Player Score: %s    Computer Score: %s    %s's Turn" % (str(scores[playerTile]), str(scores[computerTile]), turn.title()), True, TEXTCOLOR)
+    text = "Player Score: %s    Computer Score: %s    %s's Turn" % (str(scores[playerTile]), str(scores[computerTile]), turn.title())
+    if DRAWNINFO != None and DRAWNINFO[0] == text:
+        return []
+    changedRects = []
+    if DRAWNINFO != None:
+        DISPLAYSURF.blit(BGIMAGE, DRAWNINFO[1], DRAWNINFO[1]) # erase the old text
+        changedRects.append(DRAWNINFO[1])
+    scoreSurf = FONT.render(text, True, TEXTCOLOR)
     scoreRect = scoreSurf.get_rect()
     scoreRect.bottomleft = (10, WINDOWHEIGHT - 5)
     DISPLAYSURF.blit(scoreSurf, scoreRect)
+    changedRects.append(scoreRect)
+    DRAWNINFO = (text, scoreRect)
+    return changedRects
 
 
 def resetBoard(board):
     # Blanks out the board it is passed, and sets up starting tiles.
-    for x in range(BOARDWIDTH):
-        for y in range(BOARDHEIGHT):
-            board[x][y] = EMPTY_SPACE
-
-    # Add starting pieces to the center
-    board[3][3] = WHITE_TILE
-    board[3][4] = BLACK_TILE
-    board[4][3] = BLACK_TILE
-    board[4][4] = WHITE_TILE
+    board[WHITE_TILE] = getSpaceBit(3, 3) | getSpaceBit(4, 4)
+    board[BLACK_TILE] = getSpaceBit(3, 4) | getSpaceBit(4, 3)
+    board[HINT_TILE] = 0
+    board['scores'] = {WHITE_TILE: 2, BLACK_TILE: 2}
+    updateValidMoves(board)
 
 
 def getNewBoard():
     # Creates a brand new, empty board data structure.
-    board = []
-    for i in range(BOARDWIDTH):
-        board.append([EMPTY_SPACE] * BOARDHEIGHT)
+    return {WHITE_TILE: 0, BLACK_TILE: 0, HINT_TILE: 0,
+            'scores': {WHITE_TILE: 0, BLACK_TILE: 0},
+            'validMoves': {WHITE_TILE: 0, BLACK_TILE: 0}}
 
-    return board
 
+def updateValidMoves(board):
+    # Works out both players' valid moves after the board has changed.
+    board['validMoves'] = {WHITE_TILE: getValidMoveBits(board[WHITE_TILE], board[BLACK_TILE]),
+                           BLACK_TILE: getValidMoveBits(board[BLACK_TILE], board[WHITE_TILE])}
 
-def isValidMove(board, tile, xstart, ystart):
-    # Returns False if the player's move is invalid. If it is a valid
-    # move, returns a list of spaces of the captured pieces.
-    if board[xstart][ystart] != EMPTY_SPACE or not isOnBoard(xstart, ystart):
+
+def checkTrackedState(board):
+    # Recounts the scores and valid moves space by space, the slow way, and
+    # checks them against the ones the board has been keeping track of.
+    scores = {WHITE_TILE: 0, BLACK_TILE: 0}
+    validMoves = {WHITE_TILE: [], BLACK_TILE: []}
+    for x in range(BOARDWIDTH):
+        for y in range(BOARDHEIGHT):
+            tile = getTileAt(board, x, y)
+            if tile in scores:
+                scores[tile] += 1
+            for player in validMoves:
+                if canFlipFrom(board, player, x, y):
+                    validMoves[player].append((x, y))
+    assert scores == board['scores'], 'Tracked scores %s should be %s' % (board['scores'], scores)
+    for player in validMoves:
+        assert sorted(validMoves[player]) == sorted(getValidMoves(board, player)), \
+               'Tracked valid moves for %s are wrong' % (player)
+
+
+def canFlipFrom(board, tile, xstart, ystart):
+    # Returns True if the player could move at xstart, ystart, by walking
+    # out from it in each of the eight directions a space at a time. This
+    # doesn't use the bitboard fills, so checkTrackedState() can check them.
+    if getTileAt(board, xstart, ystart) in (WHITE_TILE, BLACK_TILE):
         return False
+    otherTile = getOtherTile(tile)
+    for xdirection, ydirection in [[0, 1], [1, 1], [1, 0], [1, -1], [0, -1], [-1, -1], [-1, 0], [-1, 1]]:
+        x = xstart + xdirection
+        y = ystart + ydirection
+        if not isOnBoard(x, y) or getTileAt(board, x, y) != otherTile:
+            continue # there needs to be at least one of the other player's pieces to flip
+        while isOnBoard(x, y) and getTileAt(board, x, y) == otherTile:
+            x += xdirection
+            y += ydirection
+        if isOnBoard(x, y) and getTileAt(board, x, y) == tile:
+            return True
+    return False
+
+
+def getSpaceBit(x, y):
+    # Returns the bitboard bit for the space at x, y.
+    return 1 << (y * BOARDWIDTH + x)
+
+
+def getTileAt(board, x, y):
+    # Returns WHITE_TILE, BLACK_TILE, HINT_TILE or EMPTY_SPACE.
+    spaceBit = getSpaceBit(x, y)
+    for tile in (WHITE_TILE, BLACK_TILE, HINT_TILE):
+        if board[tile] & spaceBit:
+            return tile
+    return EMPTY_SPACE
 
-    board[xstart][ystart] = tile # temporarily set the tile on the board.
 
+def getOtherTile(tile):
     if tile == WHITE_TILE:
-        otherTile = BLACK_TILE
-    else:
-        otherTile = WHITE_TILE
+        return BLACK_TILE
+    return WHITE_TILE
 
-    tilesToFlip = []
-    # check each of the eight directions:
-    for xdirection, ydirection in [[0, 1], [1, 1], [1, 0], [1, -1], [0, -1], [-1, -1], [-1, 0], [-1, 1]]:
-        x, y = xstart, ystart
-        x += xdirection
-        y += ydirection
-        if isOnBoard(x, y) and board[x][y] == otherTile:
-            # The piece belongs to the other player next to our piece.
-            x += xdirection
-            y += ydirection
-            if not isOnBoard(x, y):
-                continue
-            while board[x][y] == otherTile:
-                x += xdirection
-                y += ydirection
-                if not isOnBoard(x, y):
-                    break # break out of while loop, continue in for loop
-            if not isOnBoard(x, y):
-                continue
-            if board[x][y] == tile:
-                # There are pieces to flip over. Go in the reverse
-                # direction until we reach the original space, noting all
-                # the tiles along the way.
-                while True:
-                    x -= xdirection
-                    y -= ydirection
-                    if x == xstart and y == ystart:
-                        break
-                    tilesToFlip.append([x, y])
-
-    board[xstart][ystart] = EMPTY_SPACE # make space empty
-    if len(tilesToFlip) == 0: # If no tiles flipped, this move is invalid
+
+def isValidMove(board, tile, xstart, ystart):
+    # Returns False if the player's move is invalid. If it is a valid
+    # move, returns a list of spaces of the captured pieces.
+    if not isOnBoard(xstart, ystart) or getTileAt(board, xstart, ystart) in (WHITE_TILE, BLACK_TILE):
+        return False
+    flipBits = getFlipBits(board[tile], board[getOtherTile(tile)], getSpaceBit(xstart, ystart))
+    if flipBits == 0: # If no tiles flipped, this move is invalid
         return False
-    return tilesToFlip
+    return [[x, y] for x, y in getSpacesOfBits(flipBits)]
+
+
+def shiftBits(bits, shift):
+    # Shifts bits left for a positive shift, or right for a negative one.
+    if shift > 0:
+        return bits << shift
+    return bits >> -shift
+
+
+def getFillBits(gen, pro, shift):
+    # Returns the gen bits plus every pro bit that can be reached from them
+    # by stepping in the shift direction over only pro bits. This is a
+    # Kogge-Stone fill: each step doubles how far the bits have spread, so
+    # a whole line takes FILLSTEPS steps instead of one step per space. The
+    # pro bits must already be masked for the direction.
+    for i in range(FILLSTEPS):
+        gen |= pro & shiftBits(gen, shift)
+        pro &= shiftBits(pro, shift)
+        shift *= 2
+    return gen
+
+
+def getValidMoveBits(tileBits, otherBits):
+    # Returns the bits of every space where the player with tileBits can
+    # move: empty spaces at the end of a line of the other player's tiles
+    # that starts at one of the player's own.
+    emptyBits = FULLBITS & ~(tileBits | otherBits)
+    moveBits = 0
+    for shift, mask in DIRECTIONS:
+        lineBits = getFillBits(tileBits, otherBits & mask, shift) & ~tileBits
+        moveBits |= shiftBits(lineBits, shift) & mask & emptyBits
+    return moveBits
+
+
+def getFlipBits(tileBits, otherBits, moveBit):
+    # Returns the bits of the other player's tiles that would be flipped
+    # by moving on the (empty) space moveBit. These are the lines of their
+    # tiles that start next to moveBit and end at one of the player's own.
+    flipBits = 0
+    for shift, mask in DIRECTIONS:
+        fillBits = getFillBits(moveBit, otherBits & mask, shift)
+        lineBits = fillBits & ~moveBit
+        if lineBits and shiftBits(fillBits, shift) & mask & tileBits:
+            flipBits |= lineBits
+    return flipBits
+
+
+def getSpacesOfBits(bits):
+    # Returns a list of (x, y) tuples of the spaces with a bit set.
+    spaces = []
+    while bits:
+        lowestBit = bits & -bits
+        index = lowestBit.bit_length() - 1
+        spaces.append((index % BOARDWIDTH, index // BOARDWIDTH))
+        bits ^= lowestBit
+    return spaces
+
+
+def countBits(bits):
+    return bin(bits).count('1')
 
 
 def isOnBoard(x, y):
@@ -387,35 +605,19 @@ def isOnBoard(x, y):
 
 def getBoardWithValidMoves(board, tile):
     # Returns a new board with hint markings.
-    dupeBoard = copy.deepcopy(board)
-
-    for x, y in getValidMoves(dupeBoard, tile):
-        dupeBoard[x][y] = HINT_TILE
+    dupeBoard = dict(board)
+    dupeBoard[HINT_TILE] = board['validMoves'][tile]
     return dupeBoard
 
 
 def getValidMoves(board, tile):
     # Returns a list of (x,y) tuples of all valid moves.
-    validMoves = []
-
-    for x in range(BOARDWIDTH):
-        for y in range(BOARDHEIGHT):
-            if isValidMove(board, tile, x, y) != False:
-                validMoves.append((x, y))
-    return validMoves
+    return getSpacesOfBits(board['validMoves'][tile])
 
 
 def getScoreOfBoard(board):
-    # Determine the score by counting the tiles.
-    xscore = 0
-    oscore = 0
-    for x in range(BOARDWIDTH):
-        for y in range(BOARDHEIGHT):
-            if board[x][y] == WHITE_TILE:
-                xscore += 1
-            if board[x][y] == BLACK_TILE:
-                oscore += 1
-    return {WHITE_TILE:xscore, BLACK_TILE:oscore}
+    # Returns the scores, which makeMove() keeps counted.
+    return board['scores']
 
 
 def enterPlayerTile():
@@ -459,54 +661,321 @@ def enterPlayerTile():
 def makeMove(board, tile, xstart, ystart, realMove=False):
     # Place the tile on the board at xstart, ystart, and flip tiles
     # Returns False if this is an invalid move, True if it is valid.
-    tilesToFlip = isValidMove(board, tile, xstart, ystart)
-
-    if tilesToFlip == False:
+    otherTile = getOtherTile(tile)
+    moveBit = getSpaceBit(xstart, ystart)
+    if (board[tile] | board[otherTile]) & moveBit:
+        return False
+    flipBits = getFlipBits(board[tile], board[otherTile], moveBit)
+    if flipBits == 0:
         return False
 
-    board[xstart][ystart] = tile
+    board[tile] |= moveBit
 
     if realMove:
-        animateTileChange(tilesToFlip, tile, (xstart, ystart))
-
-    for x, y in tilesToFlip:
-        board[x][y] = tile
+        animateTileChange(getSpacesOfBits(flipBits), tile, (xstart, ystart))
+
+    board[tile] |= flipBits
+    board[otherTile] &= ~flipBits
+    numFlipped = countBits(flipBits)
+    board['scores'][tile] += numFlipped + 1
+    board['scores'][otherTile] -= numFlipped
+    updateValidMoves(board)
+    if DEBUGCHECKS:
+        checkTrackedState(board)
     return True
 
 
 def isOnCorner(x, y):
     # Returns True if the position is in one of the four corners.
     return (x == 0 and y == 0) or \
-           (x == BOARDWIDTH and y == 0) or \
-           (x == 0 and y == BOARDHEIGHT) or \
-           (x == BOARDWIDTH and y == BOARDHEIGHT)
+           (x == BOARDWIDTH - 1 and y == 0) or \
+           (x == 0 and y == BOARDHEIGHT - 1) or \
+           (x == BOARDWIDTH - 1 and y == BOARDHEIGHT - 1)
 
 
-def getComputerMove(board, computerTile):
+def getComputerMove(board, computerTile, level=COMPUTERLEVEL, thinkTime=THINKTIME, maxDepth=MAXDEPTH,
+                    endgameEmpties=ENDGAMEEMPTIES, endgameTime=ENDGAMETIME):
     # Given a board and the computer's tile, determine where to
     # move and return that move as a [x, y] list.
+    if level in (GREEDY, EASY):
+        return getGreedyMove(board, computerTile, level == EASY)
+    tileBits = board[computerTile]
+    otherBits = board[getOtherTile(computerTile)]
+    if countBits(FULLBITS & ~(tileBits | otherBits)) <= endgameEmpties:
+        move = getEndgameMove(tileBits, otherBits, endgameTime)
+        if move != None:
+            return move
+    return getSearchMove(tileBits, otherBits, thinkTime, maxDepth)
+
+
+def getGreedyMove(board, computerTile, cornersFirst=True):
+    # Returns the move that flips the most tiles. If cornersFirst is True,
+    # a corner move is taken first if there is one.
     possibleMoves = getValidMoves(board, computerTile)
 
     # randomize the order of the possible moves
     random.shuffle(possibleMoves)
 
     # always go for a corner if available.
-    for x, y in possibleMoves:
-        if isOnCorner(x, y):
-            return [x, y]
+    if cornersFirst:
+        for x, y in possibleMoves:
+            if isOnCorner(x, y):
+                return [x, y]
 
     # Go through all possible moves and remember the best scoring move
+    tileBits = board[computerTile]
+    otherBits = board[getOtherTile(computerTile)]
     bestScore = -1
     for x, y in possibleMoves:
-        dupeBoard = copy.deepcopy(board)
-        makeMove(dupeBoard, computerTile, x, y)
-        score = getScoreOfBoard(dupeBoard)[computerTile]
+        moveBit = getSpaceBit(x, y)
+        score = countBits(tileBits | moveBit | getFlipBits(tileBits, otherBits, moveBit))
         if score > bestScore:
             bestMove = [x, y]
             bestScore = score
     return bestMove
 
 
+def getSearchMove(tileBits, otherBits, thinkTime, maxDepth=None):
+    # Searches 1 move ahead, then 2, then 3 and so on until thinkTime
+    # milliseconds are up, and returns the best move (as a [x, y] list) of
+    # the deepest search that finished.
+    emptySpaces = countBits(FULLBITS & ~(tileBits | otherBits))
+    if maxDepth == None or maxDepth > emptySpaces:
+        maxDepth = emptySpaces # there's no need to look past the end of the game
+    deadline = time.time() + thinkTime / 1000.0
+    SEARCH['nodes'] = 0
+    bestMoves = []
+    for depth in range(1, maxDepth + 1):
+        # the first search always finishes, so there's always a move to make
+        SEARCH['deadline'] = deadline if depth > 1 else None
+        SEARCH['stopped'] = False
+        moves, score = getBestMoveBits(tileBits, otherBits, depth, bestMoves)
+        if SEARCH['stopped']:
+            break # ran out of time, so this search's moves can't be trusted
+        bestMoves = moves
+        SEARCH['depth'] = depth
+        if abs(score) > WINSCORE:
+            break # the end of the game was reached, searching deeper won't change anything
+    SEARCH['deadline'] = None
+    x, y = getSpacesOfBits(random.choice(bestMoves))[0]
+    return [x, y]
+
+
+def getBestMoveBits(tileBits, otherBits, depth, firstMoves=()):
+    # Returns a list of the bits of the best moves when searching depth
+    # moves ahead, and their score. The moves in firstMoves are searched
+    # before the others.
+    moveBits = getValidMoveBits(tileBits, otherBits)
+    bestScore = -WINSCORE * 2
+    bestMoves = []
+    for moveBit in list(firstMoves) + [bit for bit in getOrderedMoveBits(moveBits) if bit not in firstMoves]:
+        flipBits = getFlipBits(tileBits, otherBits, moveBit)
+        # Searching with an alpha of bestScore - 1 gives the exact score of
+        # moves that tie with the best so far, so ties can be picked from
+        # randomly.
+        score = -negamax(otherBits & ~flipBits, tileBits | flipBits | moveBit, depth - 1, -WINSCORE * 2, -(bestScore - 1))
+        if SEARCH['stopped']:
+            break
+        if score > bestScore:
+            bestScore = score
+            bestMoves = [moveBit]
+        elif score == bestScore:
+            bestMoves.append(moveBit)
+    return bestMoves, bestScore
+
+
+def negamax(tileBits, otherBits, depth, alpha, beta, passed=False):
+    # Returns the score of the position for the player with tileBits, who
+    # is about to move. A score of beta or more means the other player would
+    # never allow this position, and a score of alpha or less means there's
+    # a better move elsewhere, so in both cases the score is only a bound.
+    # passed is True if the other player had no move and had to pass.
+    SEARCH['nodes'] += 1
+    if SEARCH['nodes'] % 256 == 0:
+        checkSearchTime()
+    if SEARCH['stopped']:
+        return 0 # out of time, the caller throws this search away
+
+    moveBits = getValidMoveBits(tileBits, otherBits)
+    if moveBits == 0:
+        if passed:
+            return getFinalScore(tileBits, otherBits) # neither player can move
+        return -negamax(otherBits, tileBits, depth, -beta, -alpha, True)
+    if depth <= 0:
+        return evaluateBits(tileBits, otherBits, moveBits)
+
+    bestScore = -WINSCORE * 2
+    for moveBit in getOrderedMoveBits(moveBits):
+        flipBits = getFlipBits(tileBits, otherBits, moveBit)
+        score = -negamax(otherBits & ~flipBits, tileBits | flipBits | moveBit, depth - 1, -beta, -alpha)
+        if score > bestScore:
+            bestScore = score
+            if score > alpha:
+                alpha = score
+                if alpha >= beta:
+                    break # the other player won't let this position happen
+    return bestScore
+
+
+def getOrderedMoveBits(moveBits):
+    # Returns a list of the bits of each move, corners first and the
+    # spaces next to corners last.
+    orderedMoves = []
+    for spaceBits in MOVEORDER:
+        bits = moveBits & spaceBits
+        while bits:
+            lowestBit = bits & -bits
+            orderedMoves.append(lowestBit)
+            bits ^= lowestBit
+    return orderedMoves
+
+
+def evaluateBits(tileBits, otherBits, moveBits):
+    # Returns a rough score of how good the position is for the player with
+    # tileBits (who has the moves in moveBits): corners and stable tiles
+    # that can never be flipped are good, X squares next to an empty corner
+    # are bad, and having more moves to choose from than the other player
+    # (mobility) is good.
+    emptyBits = FULLBITS & ~(tileBits | otherBits)
+    score = 25 * (countBits(tileBits & CORNERBITS) - countBits(otherBits & CORNERBITS))
+    score += 10 * (countBits(getStableBits(tileBits)) - countBits(getStableBits(otherBits)))
+    for corner, xSquare, edges in CORNERS:
+        if corner & emptyBits:
+            if xSquare & tileBits:
+                score -= 8
+            elif xSquare & otherBits:
+                score += 8
+    score += 3 * (countBits(moveBits) - countBits(getValidMoveBits(otherBits, tileBits)))
+    return score
+
+
+def getStableBits(tileBits):
+    # Returns the bits of tiles that can never be flipped: the corners, and
+    # unbroken lines of tiles along an edge starting from a corner.
+    stableBits = 0
+    for corner, xSquare, edges in CORNERS:
+        if corner & tileBits:
+            for shift, lineBits in edges:
+                stableBits |= getFillBits(corner, tileBits & lineBits, shift)
+    return stableBits
+
+
+def getFinalScore(tileBits, otherBits):
+    # Returns the score of a finished game. Any win scores higher than any
+    # evaluateBits() score, and winning by more tiles scores higher.
+    difference = countBits(tileBits) - countBits(otherBits)
+    if difference > 0:
+        return WINSCORE + difference
+    elif difference < 0:
+        return -WINSCORE + difference
+    return 0
+
+
+def getEndgameMove(tileBits, otherBits, thinkTime):
+    # Searches all the way to the end of the game and returns the move (as
+    # a [x, y] list) that wins by the most tiles (or loses by the fewest),
+    # or None if that takes longer than thinkTime milliseconds.
+    SEARCH['deadline'] = time.time() + thinkTime / 1000.0
+    SEARCH['stopped'] = False
+    SEARCH['nodes'] = 0
+    bestScore = -BOARDWIDTH * BOARDHEIGHT - 1
+    for moveBit in getEndgameMoveOrder(tileBits, otherBits, getValidMoveBits(tileBits, otherBits)):
+        flipBits = getFlipBits(tileBits, otherBits, moveBit)
+        score = -solveEndgame(otherBits & ~flipBits, tileBits | flipBits | moveBit, -BOARDWIDTH * BOARDHEIGHT - 1, -bestScore)
+        if SEARCH['stopped']:
+            break
+        if score > bestScore:
+            bestScore = score
+            bestMove = moveBit
+    SEARCH['deadline'] = None
+    if SEARCH['stopped']:
+        return None
+    SEARCH['depth'] = countBits(FULLBITS & ~(tileBits | otherBits))
+    x, y = getSpacesOfBits(bestMove)[0]
+    return [x, y]
+
+
+def solveEndgame(tileBits, otherBits, alpha, beta, passed=False):
+    # Returns how many more tiles than the other player the player with
+    # tileBits will have at the end of the game, if both play perfectly.
+    # Like negamax(), a score outside of alpha and beta is only a bound.
+    SEARCH['nodes'] += 1
+    if SEARCH['nodes'] % 1024 == 0:
+        checkSearchTime()
+    if SEARCH['stopped']:
+        return 0 # out of time, the caller throws this search away
+
+    emptyBits = FULLBITS & ~(tileBits | otherBits)
+    if emptyBits & (emptyBits - 1) == 0:
+        return getLastMoveScore(tileBits, otherBits, emptyBits)
+    moveBits = getValidMoveBits(tileBits, otherBits)
+    if moveBits == 0:
+        if passed:
+            return countBits(tileBits) - countBits(otherBits) # neither player can move
+        return -solveEndgame(otherBits, tileBits, -beta, -alpha, True)
+
+    bestScore = -BOARDWIDTH * BOARDHEIGHT - 1
+    for moveBit in getEndgameMoveOrder(tileBits, otherBits, moveBits):
+        flipBits = getFlipBits(tileBits, otherBits, moveBit)
+        score = -solveEndgame(otherBits & ~flipBits, tileBits | flipBits | moveBit, -beta, -alpha)
+        if score > bestScore:
+            bestScore = score
+            if score > alpha:
+                alpha = score
+                if alpha >= beta:
+                    break # the other player won't let this position happen
+    return bestScore
+
+
+def getLastMoveScore(tileBits, otherBits, emptyBit):
+    # Returns the final score for the player with tileBits when only the
+    # space emptyBit (if any) is left: either player might move there.
+    if emptyBit:
+        flipBits = getFlipBits(tileBits, otherBits, emptyBit)
+        if flipBits:
+            tileBits |= flipBits | emptyBit
+            otherBits &= ~flipBits
+        else:
+            flipBits = getFlipBits(otherBits, tileBits, emptyBit)
+            otherBits |= flipBits | (emptyBit if flipBits else 0)
+            tileBits &= ~flipBits
+    return countBits(tileBits) - countBits(otherBits)
+
+
+def getEndgameMoveOrder(tileBits, otherBits, moveBits):
+    # Returns a list of the bits of each move, in the order the endgame
+    # solver should try them: moves in quadrants with an odd number of
+    # empty spaces first (parity), and within those, the moves that leave
+    # the other player the fewest moves of their own first (fastest-first).
+    # Near the very end, sorting fastest-first costs more than it saves.
+    emptyBits = FULLBITS & ~(tileBits | otherBits)
+    fastestFirst = countBits(emptyBits) > FASTESTFIRSTEMPTIES
+    orderedMoves = []
+    for moveBit in getOrderedMoveBits(moveBits):
+        otherMoves = 0
+        if fastestFirst:
+            flipBits = getFlipBits(tileBits, otherBits, moveBit)
+            otherMoves = countBits(getValidMoveBits(otherBits & ~flipBits, tileBits | flipBits | moveBit))
+        evenQuadrant = 0
+        for quadrant in QUADRANTS:
+            if quadrant & moveBit and countBits(quadrant & emptyBits) % 2 == 0:
+                evenQuadrant = 1
+        orderedMoves.append((evenQuadrant, otherMoves, len(orderedMoves), moveBit))
+    orderedMoves.sort()
+    return [moveBit for evenQuadrant, otherMoves, i, moveBit in orderedMoves]
+
+
+def checkSearchTime():
+    # Called every so often during a search. Stops the search once its
+    # deadline has passed, and handles quit events so the window keeps
+    # responding while the computer thinks. There's no window to check
+    # when playing without one, as flippy_arena.py does.
+    if SEARCH['deadline'] != None and time.time() > SEARCH['deadline']:
+        SEARCH['stopped'] = True
+    if pygame.display.get_init():
+        checkForQuit()
+
+
 def checkForQuit():
     for event in pygame.event.get((QUIT, KEYUP)): # event handling loop
         if event.type == QUIT or (event.type == KEYUP and event.key == K_ESCAPE):
@@ -0,0 +1,181 @@
+# Flippy computer player arena
+# Plays many games of Reversi between two computer players without opening
+# a window, and writes out a JSON report of wins, draws and losses, an Elo
+# estimate of how much stronger one player is, and how long each player
+# takes to move. Useful for comparing the computer levels and settings in
+# flippy.py.
+#
+# Each player is a level followed by any settings, separated by colons:
+#   greedy                        always flips the most tiles
+#   easy                          takes corners, otherwise flips the most tiles
+#   hard                          the default settings from flippy.py
+#   hard:thinktime=200            think for 200 milliseconds per move
+#   hard:maxdepth=4:endgame=0     look 4 moves ahead, don't solve the endgame
+#   hard:endgame=14:endgametime=10000
+#                                 solve the last 14 empties, taking up to 10 seconds
+#
+# Usage: python flippy_arena.py hard:maxdepth=4 easy --games 100 [--output report.json]
+
+import argparse, json, math, multiprocessing, os, random, time
+os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = '1' # importing pygame is fine, but keep it quiet
+import flippy
+from flippy import WHITE_TILE, BLACK_TILE
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Play two Flippy computer players against each other.')
+    parser.add_argument('player1', help='the first player, e.g. hard:maxdepth=4')
+    parser.add_argument('player2', help='the second player, e.g. easy')
+    parser.add_argument('--games', type=int, default=100, help='how many games to play')
+    parser.add_argument('--processes', type=int, default=multiprocessing.cpu_count(), help='games to play at once')
+    parser.add_argument('--random-moves', type=int, default=2, help='random moves at the start of each game, for variety')
+    parser.add_argument('--seed', type=int, default=None, help='random seed, for repeatable matches')
+    parser.add_argument('--output', default=None, help='file to write the JSON report to, instead of printing it')
+    args = parser.parse_args()
+
+    players = [parsePlayer(args.player1), parsePlayer(args.player2)]
+    rng = random.Random(args.seed)
+
+    # The players take turns being black, which moves first.
+    tasks = []
+    for game in range(args.games):
+        if game % 2 == 0:
+            tasks.append((players[0], players[1], 0, 1, args.random_moves, rng.getrandbits(32)))
+        else:
+            tasks.append((players[1], players[0], 1, 0, args.random_moves, rng.getrandbits(32)))
+
+    startTime = time.time()
+    pool = multiprocessing.Pool(args.processes)
+    results = pool.map(playGame, tasks, chunksize=1)
+    pool.close()
+    pool.join()
+
+    report = getReport([args.player1, args.player2], results)
+    report['seconds'] = round(time.time() - startTime, 2)
+    text = json.dumps(report, indent=2)
+    if args.output == None:
+        print(text)
+    else:
+        with open(args.output, 'w') as reportFile:
+            reportFile.write(text + '\n')
+
+
+def parsePlayer(text):
+    # Returns a dictionary of getComputerMove() settings for the player text.
+    parts = text.split(':')
+    player = {'level': parts[0], 'thinkTime': flippy.THINKTIME, 'maxDepth': flippy.MAXDEPTH,
+              'endgameEmpties': flippy.ENDGAMEEMPTIES, 'endgameTime': flippy.ENDGAMETIME}
+    if player['level'] not in (flippy.GREEDY, flippy.EASY, flippy.HARD):
+        raise SystemExit('Unknown level: %s' % (player['level']))
+    for part in parts[1:]:
+        name, value = part.split('=')
+        if name == 'thinktime':
+            player['thinkTime'] = int(value)
+        elif name == 'maxdepth':
+            player['maxDepth'] = int(value)
+        elif name == 'endgame':
+            player['endgameEmpties'] = int(value)
+        elif name == 'endgametime':
+            player['endgameTime'] = int(value)
+        else:
+            raise SystemExit('Unknown setting: %s' % (name))
+    return player
+
+
+def playGame(task):
+    # Runs in a worker process. Plays one game, where the first player is
+    # black and moves first. Returns the index of the winning player (None
+    # for a draw), the final scores by player index, and a list of
+    # (player index, seconds) for each move.
+    blackPlayer, whitePlayer, blackIndex, whiteIndex, randomMoves, seed = task
+    random.seed(seed)
+    board = flippy.getNewBoard()
+    flippy.resetBoard(board)
+    players = {BLACK_TILE: (blackPlayer, blackIndex), WHITE_TILE: (whitePlayer, whiteIndex)}
+
+    moves = []
+    tile = BLACK_TILE
+    moveNum = 0
+    while True:
+        if flippy.getValidMoves(board, tile) == []:
+            tile = flippy.getOtherTile(tile) # this player has to pass
+            if flippy.getValidMoves(board, tile) == []:
+                break # neither player can move, so the game is over
+        player, index = players[tile]
+        if moveNum < randomMoves:
+            x, y = random.choice(flippy.getValidMoves(board, tile))
+        else:
+            startTime = time.time()
+            x, y = flippy.getComputerMove(board, tile, player['level'], player['thinkTime'], player['maxDepth'],
+                                          player['endgameEmpties'], player['endgameTime'])
+            moves.append((index, time.time() - startTime))
+        flippy.makeMove(board, tile, x, y)
+        moveNum += 1
+        tile = flippy.getOtherTile(tile)
+
+    scores = flippy.getScoreOfBoard(board)
+    finalScores = {blackIndex: scores[BLACK_TILE], whiteIndex: scores[WHITE_TILE]}
+    if scores[BLACK_TILE] > scores[WHITE_TILE]:
+        return blackIndex, finalScores, moves
+    elif scores[WHITE_TILE] > scores[BLACK_TILE]:
+        return whiteIndex, finalScores, moves
+    return None, finalScores, moves
+
+
+def getReport(names, results):
+    # Returns a dictionary of the match results, ready to be written as JSON.
+    games = len(results)
+    wins = len([winner for winner, scores, moves in results if winner == 0])
+    losses = len([winner for winner, scores, moves in results if winner == 1])
+    draws = games - wins - losses
+    report = {'games': games, 'players': []}
+    for index in range(len(names)):
+        moveTimes = sorted([seconds for winner, scores, moves in results for player, seconds in moves if player == index])
+        discs = sum([scores[index] for winner, scores, moves in results])
+        report['players'].append({'player': names[index],
+                                  'wins': [wins, losses][index],
+                                  'draws': draws,
+                                  'losses': [losses, wins][index],
+                                  'averageDiscs': round(discs / games, 2) if games else 0,
+                                  'moves': len(moveTimes),
+                                  'latencyMs': getLatencyPercentiles(moveTimes)})
+    report['elo'] = getEloDifference(wins, draws, losses)
+    return report
+
+
+def getLatencyPercentiles(moveTimes):
+    # Returns the median, 90th, 99th percentile and slowest move time in
+    # milliseconds, from a sorted list of times in seconds.
+    if moveTimes == []:
+        return None
+    percentiles = {}
+    for name, percent in (('p50', 50), ('p90', 90), ('p99', 99)):
+        # Use the nearest-rank method: the smallest time that at least this
+        # percent of the moves were as fast as.
+        rank = max(1, int(math.ceil(percent / 100.0 * len(moveTimes))))
+        percentiles[name] = round(1000 * moveTimes[rank - 1], 2)
+    percentiles['max'] = round(1000 * moveTimes[-1], 2)
+    return percentiles
+
+
+def getEloDifference(wins, draws, losses):
+    # Returns how many Elo points stronger the first player is than the
+    # second, with a 95% confidence margin. Draws count as half a win.
+    games = wins + draws + losses
+    if games == 0:
+        return None
+    score = (wins + draws / 2.0) / games
+    # An all-win or all-loss match has no finite estimate, so nudge the
+    # score in by half a game.
+    score = min(max(score, 0.5 / games), 1 - 0.5 / games)
+    difference = -400 * math.log10(1 / score - 1)
+
+    # The margin comes from the standard error of the score, turned into
+    # Elo points with the slope of the Elo curve at this score.
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / games
+    margin = 1.96 * math.sqrt(variance / games) * 400 / (math.log(10) * score * (1 - score))
+    return {'difference': round(difference, 1), 'margin95': round(margin, 1), 'score': round(score, 3)}
+
+
+if __name__ == '__main__':
+    main()
@@ -3,14 +3,30 @@
 # http://inventwithpython.com/pygame
 # Released under a "Simplified BSD" license
 
-import random, copy, sys, pygame
+import random, sys, os, time, math, struct, mmap, threading, multiprocessing, pygame
 from pygame.locals import *
 
 BOARDWIDTH = 7  # how many spaces wide the board is
 BOARDHEIGHT = 6 # how many spaces tall the board is
 assert BOARDWIDTH >= 4 and BOARDHEIGHT >= 4, 'Board must be at least 4x4.'
 
-DIFFICULTY = 2 # how many moves to look ahead. (>2 is usually too much)
+# The computer player thinks using bitboards: one integer per player where
+# bit (x * COLUMNBITS + row) is set if that player has a token at column x,
+# row (counted from the bottom). Every column gets one spare bit on top that
+# is always 0, so shifting a line of tokens can never wrap into the next
+# column.
+COLUMNBITS = BOARDHEIGHT + 1
+FULLBITS = sum(((1 << BOARDHEIGHT) - 1) << (x * COLUMNBITS) for x in range(BOARDWIDTH)) # every space
+
+THINKTIME = 500 # how many milliseconds the computer may think about each move
+MAXDEPTH = None # the most moves ahead the computer may look, or None for no limit
+PROCESSES = 1 # how many processes (CPU cores) the computer thinks with
+BOOKFILE = 'assets/data/fourinarow_book.bin' # opening book made by fourinarow_makebook.py, or None
+
+NEGAMAX = 'negamax' # searches with alpha-beta pruning, plays the strongest move it finds
+CLASSIC = 'classic' # averages the fitness of every possible move, easier to beat
+PERSONALITY = NEGAMAX # which way the computer player thinks
+CLASSICDIFFICULTY = 2 # how many moves the CLASSIC computer looks ahead. (>2 is usually too much)
 
 SPACESIZE = 50 # size of the tokens and individual board spaces in pixels
 
@@ -33,12 +49,50 @@ EMPTY = None
 HUMAN = 'human'
 COMPUTER = 'computer'
 
+# Searching the center columns first finds the good moves sooner, which
+# lets alpha-beta pruning skip more of the other moves.
+COLUMNORDER = sorted(range(BOARDWIDTH), key=lambda x: abs(2 * x - (BOARDWIDTH - 1)))
+CENTERBITS = ((1 << BOARDHEIGHT) - 1) << ((BOARDWIDTH // 2) * COLUMNBITS)
+WINSCORE = 10000 # larger than any score evaluateBitboard() can give
+
+# The transposition table remembers the scores of positions the computer
+# has already searched, since the same position can be reached by playing
+# the same moves in a different order. It is kept between moves, so the
+# search for this move can reuse what was learned on the last one.
+TABLESIZE = 131071 # how many positions the transposition table holds (a prime, so keys spread out)
+EXACT = 'exact'
+LOWERBOUND = 'lowerbound'
+UPPERBOUND = 'upperbound'
+TRANSTABLE = {'entries': [None] * TABLESIZE, 'age': 0, 'hits': 0, 'misses': 0}
+
+# Keeps track of the search in progress, so it can stop when it runs out of
+# time or is cancelled. Afterwards it holds how deep the last search got and
+# how many positions (nodes) it looked at.
+SEARCH = {'deadline': None, 'stopped': False, 'cancelled': False, 'nodes': 0, 'depth': 0}
+
+# When thinking with more than one process, each column is searched by one
+# of these worker processes. Each worker has its own transposition table.
+WORKERPOOL = {'pool': None, 'processes': 0}
+
+# The opening book file is a header followed by records sorted by position
+# key. Each record is the key of a position with BLACK to move and a byte
+# with one bit set for each of the best columns to move in, found by a deep
+# search rather than by solving the position. The file is
+# memory-mapped the first time the computer moves, so it isn't read into
+# memory and doesn't slow down starting the game.
+BOOKHEADER = struct.Struct('>4sBB') # 'BOOK', BOARDWIDTH, BOARDHEIGHT
+BOOKRECORD = struct.Struct('>QB') # position key, best columns
+OPENINGBOOK = {'loaded': False, 'data': None, 'records': 0}
+
 
 def main():
     global FPSCLOCK, DISPLAYSURF, REDPILERECT, BLACKPILERECT, REDTOKENIMG
     global BLACKTOKENIMG, BOARDIMG, ARROWIMG, ARROWRECT, HUMANWINNERIMG
     global COMPUTERWINNERIMG, WINNERRECT, TIEWINNERIMG
 
+    if PROCESSES > 1:
+        # start the worker processes before the window opens
+        getWorkerPool(PROCESSES)
     pygame.init()
     FPSCLOCK = pygame.time.Clock()
     DISPLAYSURF = pygame.display.set_mode((WINDOWWIDTH, WINDOWHEIGHT))
@@ -87,6 +141,7 @@ def runGame(isFirstGame):
 
     # Set up a blank board data structure.
     mainBoard = getNewBoard()
+    resetTranspositionTable()
 
     while True: # main game loop
         if turn == HUMAN:
@@ -101,7 +156,7 @@ def runGame(isFirstGame):
             turn = COMPUTER # switch to other player's turn
         else:
             # Computer player's turn.
-            column = getComputerMove(mainBoard)
+            column = waitForComputerMove(mainBoard)
             animateComputerMoving(mainBoard, column)
             makeMove(mainBoard, BLACK, column)
             if isWinner(mainBoard, BLACK):
@@ -254,62 +309,495 @@ def animateComputerMoving(board, column):
     animateDroppingToken(board, column, BLACK)
 
 
-def getComputerMove(board):
-    potentialMoves = getPotentialMoves(board, BLACK, DIFFICULTY)
+def waitForComputerMove(board):
+    # The computer thinks in another thread, so that the window keeps
+    # drawing and handling events while it waits. The black token on the
+    # pile bobs up and down to show the computer is thinking.
+    result = {}
+    SEARCH['cancelled'] = False
+    thinkingThread = threading.Thread(target=lambda: result.update(column=getComputerMove(board)))
+    thinkingThread.daemon = True
+    thinkingThread.start()
+    frame = 0
+    while thinkingThread.is_alive():
+        for event in pygame.event.get(): # event handling loop
+            if event.type == QUIT or (event.type == KEYUP and event.key == K_ESCAPE):
+                # stop the search before quitting
+                SEARCH['cancelled'] = True
+                thinkingThread.join()
+                pygame.quit()
+                sys.exit()
+        bounce = int(abs(math.sin(frame * 0.2)) * SPACESIZE / 4)
+        drawBoard(board, {'x':BLACKPILERECT.left, 'y':BLACKPILERECT.top - bounce, 'color':BLACK})
+        pygame.display.update()
+        FPSCLOCK.tick(FPS) # also leaves the thinking thread time to think
+        frame += 1
+    return result['column']
+
+
+def getComputerMove(board, personality=PERSONALITY, thinkTime=THINKTIME, maxDepth=MAXDEPTH, processes=PROCESSES, useBook=True):
+    bitboard = getBitboardFromBoard(board)
+    # Book and CLASSIC moves don't search, so they count as zero nodes.
+    SEARCH['nodes'] = 0
+    SEARCH['depth'] = 0
+    if personality == CLASSIC:
+        return getClassicMove(bitboard)
+    if useBook:
+        bookMoves = getBookMoves(bitboard, BLACK)
+        if bookMoves:
+            return random.choice(bookMoves)
+    if processes > 1:
+        return getParallelMove(bitboard, BLACK, thinkTime, maxDepth, processes)
+    return getIterativeDeepeningMove(bitboard, BLACK, thinkTime, maxDepth)
+
+
+def getClassicMove(bitboard):
+    potentialMoves = getPotentialMoves(bitboard, BLACK, CLASSICDIFFICULTY)
     # get the best fitness from the potential moves
     bestMoveFitness = -1
     for i in range(BOARDWIDTH):
-        if potentialMoves[i] > bestMoveFitness and isValidMove(board, i):
+        if potentialMoves[i] > bestMoveFitness and isBitboardValidMove(bitboard, i):
             bestMoveFitness = potentialMoves[i]
     # find all potential moves that have this best fitness
     bestMoves = []
     for i in range(len(potentialMoves)):
-        if potentialMoves[i] == bestMoveFitness and isValidMove(board, i):
+        if potentialMoves[i] == bestMoveFitness and isBitboardValidMove(bitboard, i):
             bestMoves.append(i)
     return random.choice(bestMoves)
 
 
-def getPotentialMoves(board, tile, lookAhead):
-    if lookAhead == 0 or isBoardFull(board):
+def getPotentialMoves(bitboard, tile, lookAhead):
+    if lookAhead == 0 or isBitboardFull(bitboard):
         return [0] * BOARDWIDTH
 
-    if tile == RED:
-        enemyTile = BLACK
-    else:
-        enemyTile = RED
+    enemyTile = getEnemyTile(tile)
 
-    # Figure out the best move to make.
+    # Figure out the best move to make. Moves are made and then undone on
+    # the one bitboard instead of searching copies of the board.
     potentialMoves = [0] * BOARDWIDTH
     for firstMove in range(BOARDWIDTH):
-        dupeBoard = copy.deepcopy(board)
-        if not isValidMove(dupeBoard, firstMove):
+        if not isBitboardValidMove(bitboard, firstMove):
             continue
-        makeMove(dupeBoard, tile, firstMove)
-        if isWinner(dupeBoard, tile):
+        makeBitboardMove(bitboard, tile, firstMove)
+        if hasFourInARow(bitboard[tile]):
             # a winning move automatically gets a perfect fitness
             potentialMoves[firstMove] = 1
+            undoBitboardMove(bitboard, tile, firstMove)
             break # don't bother calculating other moves
-        else:
-            # do other player's counter moves and determine best one
-            if isBoardFull(dupeBoard):
-                potentialMoves[firstMove] = 0
-            else:
-                for counterMove in range(BOARDWIDTH):
-                    dupeBoard2 = copy.deepcopy(dupeBoard)
-                    if not isValidMove(dupeBoard2, counterMove):
-                        continue
-                    makeMove(dupeBoard2, enemyTile, counterMove)
-                    if isWinner(dupeBoard2, enemyTile):
-                        # a losing move automatically gets the worst fitness
-                        potentialMoves[firstMove] = -1
-                        break
-                    else:
-                        # do the recursive call to getPotentialMoves()
-                        results = getPotentialMoves(dupeBoard2, tile, lookAhead - 1)
-                        potentialMoves[firstMove] += (sum(results) / BOARDWIDTH) / BOARDWIDTH
+        # do other player's counter moves and determine best one
+        if not isBitboardFull(bitboard):
+            for counterMove in range(BOARDWIDTH):
+                if not isBitboardValidMove(bitboard, counterMove):
+                    continue
+                makeBitboardMove(bitboard, enemyTile, counterMove)
+                if hasFourInARow(bitboard[enemyTile]):
+                    # a losing move automatically gets the worst fitness
+                    potentialMoves[firstMove] = -1
+                    undoBitboardMove(bitboard, enemyTile, counterMove)
+                    break
+                # do the recursive call to getPotentialMoves()
+                results = getPotentialMoves(bitboard, tile, lookAhead - 1)
+                potentialMoves[firstMove] += (sum(results) / BOARDWIDTH) / BOARDWIDTH
+                undoBitboardMove(bitboard, enemyTile, counterMove)
+        undoBitboardMove(bitboard, tile, firstMove)
     return potentialMoves
 
 
+def getIterativeDeepeningMove(bitboard, tile, thinkTime, maxDepth=None):
+    # Returns one of the best moves found by getIterativeDeepeningMoves(),
+    # or None if the search is cancelled before any move was found.
+    bestMoves = getIterativeDeepeningMoves(bitboard, tile, thinkTime, maxDepth)
+    if not bestMoves:
+        return None
+    return random.choice(bestMoves)
+
+
+def getIterativeDeepeningMoves(bitboard, tile, thinkTime, maxDepth=None):
+    # Searches 1 move ahead, then 2, then 3 and so on until thinkTime
+    # milliseconds are up, and returns the best moves of the deepest search
+    # that finished. Each search is quick to redo because the transposition
+    # table remembers the best moves of the one before it.
+    emptySpaces = countBits(FULLBITS ^ (bitboard[RED] | bitboard[BLACK]))
+    if maxDepth == None or maxDepth > emptySpaces:
+        maxDepth = emptySpaces # there's no need to look past the end of the game
+    deadline = time.time() + thinkTime / 1000.0
+    TRANSTABLE['age'] += 1 # older entries can now be replaced
+    SEARCH['nodes'] = 0
+    bestMoves = []
+    for depth in range(1, maxDepth + 1):
+        # the first search always finishes, so there's always a move to make
+        SEARCH['deadline'] = deadline if depth > 1 else None
+        SEARCH['stopped'] = False
+        moves, score = getNegamaxMoves(bitboard, tile, depth, bestMoves)
+        if SEARCH['stopped']:
+            break # ran out of time, so this search's moves can't be trusted
+        bestMoves = moves
+        SEARCH['depth'] = depth
+        if abs(score) > WINSCORE:
+            break # someone can force a win, so searching deeper won't change anything
+    SEARCH['deadline'] = None
+    return bestMoves
+
+
+def getParallelMove(bitboard, tile, thinkTime, maxDepth, processes):
+    # Like getIterativeDeepeningMove(), but each column is searched in a
+    # worker process, so several CPU cores can think at the same time.
+    # Returns the best move of the deepest search that finished for every
+    # column, or None if the search is cancelled.
+    validMoves = []
+    for column in COLUMNORDER:
+        if isBitboardValidMove(bitboard, column):
+            if hasFourInARow(bitboard[tile] | (1 << (column * COLUMNBITS + bitboard['heights'][column]))):
+                return column # no need to search when we can win right away
+            validMoves.append(column)
+    emptySpaces = countBits(FULLBITS ^ (bitboard[RED] | bitboard[BLACK]))
+    if maxDepth == None or maxDepth > emptySpaces:
+        maxDepth = emptySpaces
+    deadline = time.time() + thinkTime / 1000.0
+
+    tasks = [(bitboard, tile, column, deadline, maxDepth) for column in validMoves]
+    asyncResults = getWorkerPool(processes).map_async(searchColumn, tasks)
+    while not asyncResults.ready():
+        asyncResults.wait(0.05)
+        if SEARCH['cancelled']:
+            closeWorkerPool()
+            return None
+    results = asyncResults.get()
+
+    # Only compare the columns at a depth every one of them finished.
+    depth = min([len(scores) for scores, nodes in results])
+    SEARCH['depth'] = depth
+    SEARCH['nodes'] = sum([nodes for scores, nodes in results])
+    bestScore = max([scores[depth - 1] for scores, nodes in results])
+    bestMoves = []
+    for i in range(len(validMoves)):
+        if results[i][0][depth - 1] == bestScore:
+            bestMoves.append(validMoves[i])
+    return random.choice(bestMoves)
+
+
+def searchColumn(task):
+    # Runs in a worker process for getParallelMove(). Returns a list of the
+    # scores of tile moving in the column, one for each depth searched
+    # before the deadline, and how many nodes were searched.
+    bitboard, tile, column, deadline, maxDepth = task
+    enemyTile = getEnemyTile(tile)
+    TRANSTABLE['age'] += 1
+    SEARCH['nodes'] = 0
+    SEARCH['cancelled'] = False
+    makeBitboardMove(bitboard, tile, column) # bitboard is this worker's own copy
+    scores = []
+    for depth in range(1, maxDepth + 1):
+        # the first search always finishes, so there's always a score
+        SEARCH['deadline'] = deadline if depth > 1 else None
+        SEARCH['stopped'] = False
+        score = -negamax(bitboard, enemyTile, tile, depth - 1, -WINSCORE * 2, WINSCORE * 2)
+        if SEARCH['stopped']:
+            break
+        scores.append(score)
+        if abs(score) > WINSCORE:
+            # a forced win or loss scores the same however deep we look
+            scores.extend([score] * (maxDepth - depth))
+            break
+    SEARCH['deadline'] = None
+    return scores, SEARCH['nodes']
+
+
+def getWorkerPool(processes):
+    # Returns the pool of worker processes, starting it if needed.
+    if WORKERPOOL['pool'] == None or WORKERPOOL['processes'] != processes:
+        closeWorkerPool()
+        WORKERPOOL['pool'] = multiprocessing.Pool(processes)
+        WORKERPOOL['processes'] = processes
+    return WORKERPOOL['pool']
+
+
+def closeWorkerPool():
+    # Stops the worker processes (and forgets their transposition tables).
+    if WORKERPOOL['pool'] != None:
+        WORKERPOOL['pool'].terminate()
+        WORKERPOOL['pool'].join()
+        WORKERPOOL['pool'] = None
+        WORKERPOOL['processes'] = 0
+
+
+def getNegamaxMoves(bitboard, tile, depth, firstMoves=()):
+    # Returns a list of the columns for tile to move in that have the best
+    # score when searching depth moves (plies) ahead, and that score. The
+    # columns in firstMoves are searched before the others.
+    enemyTile = getEnemyTile(tile)
+    bestScore = -WINSCORE * 2
+    bestMoves = []
+    for column in list(firstMoves) + [x for x in COLUMNORDER if x not in firstMoves]:
+        if not isBitboardValidMove(bitboard, column):
+            continue
+        if hasFourInARow(bitboard[tile] | (1 << (column * COLUMNBITS + bitboard['heights'][column]))):
+            score = getWinScore(bitboard)
+        else:
+            # Searching with an alpha of bestScore - 1 gives the exact score
+            # of moves that tie with the best so far, so ties can be picked
+            # from randomly.
+            makeBitboardMove(bitboard, tile, column)
+            score = -negamax(bitboard, enemyTile, tile, depth - 1, -WINSCORE * 2, -(bestScore - 1))
+            undoBitboardMove(bitboard, tile, column)
+            if SEARCH['stopped']:
+                break
+        if score > bestScore:
+            bestScore = score
+            bestMoves = [column]
+        elif score == bestScore:
+            bestMoves.append(column)
+    return bestMoves, bestScore
+
+
+def negamax(bitboard, tile, enemyTile, depth, alpha, beta):
+    # Returns the score of the bitboard for tile, the player about to move.
+    # A score of beta or more means the enemy would never allow this
+    # position, and a score of alpha or less means tile has a better move
+    # elsewhere, so in both cases the score is only a bound.
+    SEARCH['nodes'] += 1
+    if SEARCH['nodes'] % 1024 == 0:
+        if SEARCH['cancelled'] or (SEARCH['deadline'] != None and time.time() > SEARCH['deadline']):
+            SEARCH['stopped'] = True
+    if SEARCH['stopped']:
+        return 0 # out of time or cancelled, the caller throws this search away
+
+    heights = bitboard['heights']
+    validMoves = []
+    for column in COLUMNORDER:
+        if heights[column] < BOARDHEIGHT:
+            # check for a winning move before searching anything else
+            if hasFourInARow(bitboard[tile] | (1 << (column * COLUMNBITS + heights[column]))):
+                return getWinScore(bitboard)
+            validMoves.append(column)
+    if not validMoves:
+        return 0 # the board is full, so it's a tie
+    if depth <= 0:
+        return evaluateBitboard(bitboard, tile, enemyTile)
+
+    key = getPositionKey(bitboard, tile)
+    entry = TRANSTABLE['entries'][key % TABLESIZE]
+    if entry != None and entry['key'] == key:
+        TRANSTABLE['hits'] += 1
+        if entry['depth'] >= depth:
+            if entry['flag'] == EXACT:
+                return entry['score']
+            elif entry['flag'] == LOWERBOUND and entry['score'] >= beta:
+                return entry['score']
+            elif entry['flag'] == UPPERBOUND and entry['score'] <= alpha:
+                return entry['score']
+        if entry['move'] != None:
+            # search the best move from last time first
+            validMoves.remove(entry['move'])
+            validMoves.insert(0, entry['move'])
+    else:
+        TRANSTABLE['misses'] += 1
+
+    originalAlpha = alpha
+    bestScore = -WINSCORE * 2
+    bestMove = None
+    for column in validMoves:
+        makeBitboardMove(bitboard, tile, column)
+        score = -negamax(bitboard, enemyTile, tile, depth - 1, -beta, -alpha)
+        undoBitboardMove(bitboard, tile, column)
+        if SEARCH['stopped']:
+            return 0 # don't store the score of an unfinished search
+        if score > bestScore:
+            bestScore = score
+            bestMove = column
+            if score > alpha:
+                alpha = score
+                if alpha >= beta:
+                    break # the enemy won't let this position happen
+
+    if bestScore <= originalAlpha:
+        flag = UPPERBOUND
+        bestMove = None # every move was too weak to say which is best
+    elif bestScore >= beta:
+        flag = LOWERBOUND
+    else:
+        flag = EXACT
+    storeTableEntry(key, depth, flag, bestScore, bestMove)
+    return bestScore
+
+
+def getBookMoves(bitboard, tile):
+    # Returns the list of best columns for tile from the opening book, or an
+    # empty list if the position isn't in the book.
+    if not OPENINGBOOK['loaded']:
+        loadOpeningBook()
+    if OPENINGBOOK['data'] == None:
+        return []
+    key = getPositionKey(bitboard, tile)
+    # binary search the sorted records for the key
+    low = 0
+    high = OPENINGBOOK['records'] - 1
+    while low <= high:
+        middle = (low + high) // 2
+        recordKey, columns = BOOKRECORD.unpack_from(OPENINGBOOK['data'], BOOKHEADER.size + middle * BOOKRECORD.size)
+        if recordKey == key:
+            return [x for x in range(BOARDWIDTH) if columns & (1 << x)]
+        elif recordKey < key:
+            low = middle + 1
+        else:
+            high = middle - 1
+    return []
+
+
+def loadOpeningBook():
+    # Memory-maps the opening book file, if there is one made for this size
+    # of board.
+    OPENINGBOOK['loaded'] = True
+    if BOOKFILE == None or not os.path.exists(BOOKFILE) or os.path.getsize(BOOKFILE) < BOOKHEADER.size:
+        return
+    with open(BOOKFILE, 'rb') as bookFile:
+        data = mmap.mmap(bookFile.fileno(), 0, access=mmap.ACCESS_READ)
+    if BOOKHEADER.unpack_from(data, 0) != (b'BOOK', BOARDWIDTH, BOARDHEIGHT):
+        data.close()
+        return
+    OPENINGBOOK['data'] = data
+    OPENINGBOOK['records'] = (len(data) - BOOKHEADER.size) // BOOKRECORD.size
+
+
+def getPositionKey(bitboard, tile):
+    # Returns a number unique to this position and player to move. Adding
+    # the red bits to the bits of all tokens sets one bit just above the
+    # top token of each column (these additions never carry into the next
+    # column) and keeps the red bits below it, so each column is encoded
+    # exactly. The lowest bit of the key is the player to move.
+    key = bitboard[RED] + (bitboard[RED] | bitboard[BLACK])
+    if tile == BLACK:
+        return key * 2 + 1
+    return key * 2
+
+
+def storeTableEntry(key, depth, flag, score, move):
+    # Stores the search result in the transposition table. An entry is only
+    # replaced by a search that went at least as deep, unless it is left
+    # over from the computer's earlier moves.
+    index = key % TABLESIZE
+    entry = TRANSTABLE['entries'][index]
+    if entry == None or entry['age'] != TRANSTABLE['age'] or depth >= entry['depth']:
+        TRANSTABLE['entries'][index] = {'key': key, 'depth': depth, 'flag': flag,
+                                        'score': score, 'move': move, 'age': TRANSTABLE['age']}
+
+
+def resetTranspositionTable():
+    # Forgets every searched position, e.g. when a new game starts.
+    TRANSTABLE['entries'] = [None] * TABLESIZE
+    TRANSTABLE['age'] = 0
+    TRANSTABLE['hits'] = 0
+    TRANSTABLE['misses'] = 0
+
+
+def getTranspositionTableStats():
+    # Returns how often the search found a position in the table (hits) or
+    # not (misses), for measuring how much the table helps.
+    lookups = TRANSTABLE['hits'] + TRANSTABLE['misses']
+    used = len(TRANSTABLE['entries']) - TRANSTABLE['entries'].count(None)
+    return {'hits': TRANSTABLE['hits'], 'misses': TRANSTABLE['misses'],
+            'hitRate': TRANSTABLE['hits'] / lookups if lookups else 0.0,
+            'used': used, 'size': TABLESIZE}
+
+
+def getWinScore(bitboard):
+    # Returns the score for winning with the next move. Winning sooner
+    # leaves more empty spaces, so it scores higher.
+    return WINSCORE + countBits(FULLBITS ^ (bitboard[RED] | bitboard[BLACK])) - 1
+
+
+def evaluateBitboard(bitboard, tile, enemyTile):
+    # Returns a rough score of how good the position is for tile: the spaces
+    # that would complete a four in a row for tile, minus the ones for the
+    # enemy, plus a little for tokens in the center column.
+    empty = FULLBITS ^ (bitboard[tile] | bitboard[enemyTile])
+    score = 4 * (countBits(getThreatBits(bitboard[tile]) & empty) - countBits(getThreatBits(bitboard[enemyTile]) & empty))
+    return score + countBits(bitboard[tile] & CENTERBITS) - countBits(bitboard[enemyTile] & CENTERBITS)
+
+
+def getThreatBits(bits):
+    # Returns the bits of every space that would complete a four in a row
+    # with these tokens. Includes spaces that are already taken.
+    threats = (bits << 1) & (bits << 2) & (bits << 3) # vertical (only upwards)
+    for shift in (COLUMNBITS, COLUMNBITS - 1, COLUMNBITS + 1):
+        # three tokens to one side, or two on one side and one on the other
+        pairs = (bits << shift) & (bits << (2 * shift))
+        threats |= pairs & (bits << (3 * shift))
+        threats |= pairs & (bits >> shift)
+        pairs = (bits >> shift) & (bits >> (2 * shift))
+        threats |= pairs & (bits << shift)
+        threats |= pairs & (bits >> (3 * shift))
+    return threats & FULLBITS
+
+
+def countBits(bits):
+    return bin(bits).count('1')
+
+
+def getEnemyTile(tile):
+    if tile == RED:
+        return BLACK
+    return RED
+
+
+def getBitboardFromBoard(board):
+    # Returns a bitboard data structure (a dictionary with one integer of
+    # token bits per player, plus the height of each column) for the board.
+    bitboard = {RED: 0, BLACK: 0, 'heights': [0] * BOARDWIDTH}
+    for x in range(BOARDWIDTH):
+        for y in range(BOARDHEIGHT - 1, -1, -1):
+            if board[x][y] == EMPTY:
+                break
+            row = BOARDHEIGHT - 1 - y
+            bitboard[board[x][y]] |= 1 << (x * COLUMNBITS + row)
+            bitboard['heights'][x] = row + 1
+    return bitboard
+
+
+def getTileBits(board, tile):
+    # Returns the bitboard integer of just this tile's tokens on the board.
+    bits = 0
+    for x in range(BOARDWIDTH):
+        for y in range(BOARDHEIGHT):
+            if board[x][y] == tile:
+                bits |= 1 << (x * COLUMNBITS + BOARDHEIGHT - 1 - y)
+    return bits
+
+
+def makeBitboardMove(bitboard, tile, column):
+    # Drops the tile into the column. The column must not be full.
+    height = bitboard['heights'][column]
+    bitboard[tile] |= 1 << (column * COLUMNBITS + height)
+    bitboard['heights'][column] = height + 1
+
+
+def undoBitboardMove(bitboard, tile, column):
+    # Takes back the last tile dropped into the column by makeBitboardMove().
+    height = bitboard['heights'][column] - 1
+    bitboard[tile] ^= 1 << (column * COLUMNBITS + height)
+    bitboard['heights'][column] = height
+
+
+def isBitboardValidMove(bitboard, column):
+    return 0 <= column < BOARDWIDTH and bitboard['heights'][column] < BOARDHEIGHT
+
+
+def isBitboardFull(bitboard):
+    return (bitboard[RED] | bitboard[BLACK]) == FULLBITS
+
+
+def hasFourInARow(bits):
+    # Returns True if the bits contain four in a row in any direction. For
+    # each direction, the first shift finds pairs of tokens next to each
+    # other and the second shift finds two such pairs next to each other.
+    for shift in (1, COLUMNBITS, COLUMNBITS - 1, COLUMNBITS + 1):
+        # the shifts are: vertical, horizontal, / diagonal, \ diagonal
+        pairs = bits & (bits >> shift)
+        if pairs & (pairs >> (2 * shift)):
+            return True
+    return False
+
+
 def getLowestEmptySpace(board, column):
     # Return the row number of the lowest empty row in the given column.
     for y in range(BOARDHEIGHT-1, -1, -1):
@@ -327,36 +815,16 @@ def isValidMove(board, column):
 
 
 def isBoardFull(board):
-    # Returns True if there are no empty spaces anywhere on the board.
+    # Returns True if there are no empty spaces anywhere on the board. Tokens
+    # stack from the bottom, so only the top row needs to be checked.
     for x in range(BOARDWIDTH):
-        for y in range(BOARDHEIGHT):
-            if board[x][y] == EMPTY:
-                return False
+        if board[x][0] == EMPTY:
+            return False
     return True
 
 
 def isWinner(board, tile):
-    # check horizontal spaces
-    for x in range(BOARDWIDTH - 3):
-        for y in range(BOARDHEIGHT):
-            if board[x][y] == tile and board[x+1][y] == tile and board[x+2][y] == tile and board[x+3][y] == tile:
-                return True
-    # check vertical spaces
-    for x in range(BOARDWIDTH):
-        for y in range(BOARDHEIGHT - 3):
-            if board[x][y] == tile and board[x][y+1] == tile and board[x][y+2] == tile and board[x][y+3] == tile:
-                return True
-    # check / diagonal spaces
-    for x in range(BOARDWIDTH - 3):
-        for y in range(3, BOARDHEIGHT):
-            if board[x][y] == tile and board[x+1][y-1] == tile and board[x+2][y-2] == tile and board[x+3][y-3] == tile:
-                return True
-    # check \ diagonal spaces
-    for x in range(BOARDWIDTH - 3):
-        for y in range(BOARDHEIGHT - 3):
-            if board[x][y] == tile and board[x+1][y+1] == tile and board[x+2][y+2] == tile and board[x+3][y+3] == tile:
-                return True
-    return False
+    return hasFourInARow(getTileBits(board, tile))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,66 @@
+# Four-In-A-Row computer player benchmark
+# Times how long the computer takes to search a set of positions to a fixed
+# depth, first with one process and then with several, and reports the
+# speedup from searching the columns in parallel.
+#
+# Usage: python fourinarow_benchmark.py [--depth 9] [--processes 4] [--positions 8]
+
+import argparse, random, time, multiprocessing
+import fourinarow
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the Four in a Row computer player.')
+    parser.add_argument('--depth', type=int, default=9, help='how many moves ahead to search')
+    parser.add_argument('--processes', type=int, default=multiprocessing.cpu_count(), help='processes for the parallel search')
+    parser.add_argument('--positions', type=int, default=8, help='how many positions to search')
+    parser.add_argument('--seed', type=int, default=0, help='random seed for the positions')
+    args = parser.parse_args()
+
+    positions = getRandomPositions(args.positions, random.Random(args.seed))
+    print('Searching %s positions %s moves ahead.' % (len(positions), args.depth))
+    print('%8s %12s %12s %9s' % ('position', '1 process', '%s processes' % (args.processes), 'speedup'))
+
+    totalSerial = totalParallel = 0.0
+    for i in range(len(positions)):
+        # Each search starts with empty transposition tables, so neither
+        # side reuses work from the position before.
+        fourinarow.resetTranspositionTable()
+        serialTime = timeSearch(positions[i], args.depth, 1)
+        fourinarow.closeWorkerPool()
+        fourinarow.getWorkerPool(args.processes) # don't time starting the processes
+        parallelTime = timeSearch(positions[i], args.depth, args.processes)
+        totalSerial += serialTime
+        totalParallel += parallelTime
+        print('%8s %11.3fs %11.3fs %8.2fx' % (i + 1, serialTime, parallelTime, serialTime / parallelTime))
+    fourinarow.closeWorkerPool()
+    print('%8s %11.3fs %11.3fs %8.2fx' % ('total', totalSerial, totalParallel, totalSerial / totalParallel))
+
+
+def getRandomPositions(numPositions, rng):
+    # Returns a list of boards after a few random opening moves, skipping any
+    # where someone has already won.
+    positions = []
+    while len(positions) < numPositions:
+        board = fourinarow.getNewBoard()
+        tile = fourinarow.RED
+        for i in range(rng.randint(2, 8)):
+            column = rng.choice([x for x in range(fourinarow.BOARDWIDTH) if fourinarow.isValidMove(board, x)])
+            fourinarow.makeMove(board, tile, column)
+            tile = fourinarow.getEnemyTile(tile)
+        if not fourinarow.isWinner(board, fourinarow.RED) and not fourinarow.isWinner(board, fourinarow.BLACK):
+            positions.append(board)
+    return positions
+
+
+def timeSearch(board, depth, processes):
+    # Returns how many seconds a search to exactly this depth takes. The
+    # think time is long enough that the depth is what stops the search, and
+    # the opening book is skipped so early positions are searched too.
+    startTime = time.time()
+    fourinarow.getComputerMove(board, thinkTime=3600000, maxDepth=depth, processes=processes, useBook=False)
+    return time.time() - startTime
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+# Four-In-A-Row opening book maker
+# Searches every position the computer (BLACK) can face in the first few
+# moves of a game, whoever goes first, and writes the best moves to the
+# opening book file that fourinarow.py reads. This is slow, but only needs
+# to be done once for each board size.
+#
+# The book is not solved. Each position is searched --depth moves ahead with
+# the same evaluation the computer uses when it plays, so a book entry holds
+# the moves that look best to a deep search, which may not be the moves that
+# are best with perfect play. Several columns often tie. Solving these early
+# positions to the end of the game would take far too long in Python, but
+# the book still saves the computer its slowest searches.
+#
+# Usage: python fourinarow_makebook.py [--plies 4] [--depth 12] [--processes 4]
+
+import argparse, multiprocessing, os, time
+import fourinarow
+from fourinarow import RED, BLACK
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Make the Four in a Row opening book.')
+    parser.add_argument('--plies', type=int, default=4, help='book positions with fewer than this many tokens played')
+    parser.add_argument('--depth', type=int, default=12, help='how many moves ahead to search each position')
+    parser.add_argument('--processes', type=int, default=multiprocessing.cpu_count(), help='how many positions to search at once')
+    parser.add_argument('--output', default=fourinarow.BOOKFILE, help='the opening book file to write')
+    args = parser.parse_args()
+
+    positions = getBookPositions(args.plies)
+    print('Searching %s positions %s moves ahead with %s processes...' % (len(positions), args.depth, args.processes))
+    startTime = time.time()
+    pool = multiprocessing.Pool(args.processes)
+    tasks = [(bitboard, args.depth) for bitboard in positions.values()]
+    book = {}
+    for key, columns in pool.imap_unordered(searchPosition, tasks, chunksize=4):
+        book[key] = columns
+        if len(book) % 100 == 0:
+            print('%s/%s positions done' % (len(book), len(positions)))
+    pool.close()
+    pool.join()
+
+    writeBook(args.output, book)
+    print('Wrote %s positions to %s in %.1f seconds.' % (len(book), args.output, time.time() - startTime))
+
+
+def getBookPositions(plies):
+    # Returns a dictionary of position key to bitboard for every position
+    # with fewer than plies tokens played where it is BLACK's turn and
+    # nobody has won yet. Games where RED goes first and games where BLACK
+    # goes first are both included.
+    positions = {}
+    for firstTile in (RED, BLACK):
+        addBookPositions(fourinarow.getBitboardFromBoard(fourinarow.getNewBoard()), firstTile, plies, positions)
+    return positions
+
+
+def addBookPositions(bitboard, tile, plies, positions):
+    # Adds the position (with tile to move) and the positions after it to
+    # the positions dictionary.
+    if plies == 0 or fourinarow.isBitboardFull(bitboard):
+        return
+    key = fourinarow.getPositionKey(bitboard, tile)
+    if tile == BLACK:
+        if key in positions:
+            return # already reached through a different order of moves
+        positions[key] = {RED: bitboard[RED], BLACK: bitboard[BLACK], 'heights': list(bitboard['heights'])}
+    enemyTile = fourinarow.getEnemyTile(tile)
+    for column in range(fourinarow.BOARDWIDTH):
+        if not fourinarow.isBitboardValidMove(bitboard, column):
+            continue
+        fourinarow.makeBitboardMove(bitboard, tile, column)
+        if not fourinarow.hasFourInARow(bitboard[tile]):
+            addBookPositions(bitboard, enemyTile, plies - 1, positions)
+        fourinarow.undoBitboardMove(bitboard, tile, column)
+
+
+def searchPosition(task):
+    # Runs in a worker process. Returns the position's key and a byte with a
+    # bit set for each of BLACK's best columns, as far as a depth move
+    # search can tell.
+    bitboard, depth = task
+    key = fourinarow.getPositionKey(bitboard, BLACK)
+    bestMoves = fourinarow.getIterativeDeepeningMoves(bitboard, BLACK, 3600000, depth)
+    columns = 0
+    for column in bestMoves:
+        columns |= 1 << column
+    return key, columns
+
+
+def writeBook(filename, book):
+    # Writes the book's records, sorted by key so they can be binary searched.
+    if os.path.dirname(filename) and not os.path.isdir(os.path.dirname(filename)):
+        os.makedirs(os.path.dirname(filename))
+    with open(filename, 'wb') as bookFile:
+        bookFile.write(fourinarow.BOOKHEADER.pack(b'BOOK', fourinarow.BOARDWIDTH, fourinarow.BOARDHEIGHT))
+        for key in sorted(book):
+            bookFile.write(fourinarow.BOOKRECORD.pack(key, book[key]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+# Four-In-A-Row computer player tournament
+# Plays many games between computer players without opening a window, and
+# reports how often each player wins, how long it takes to move and how
+# many positions per second it searches. Useful for tuning THINKTIME,
+# MAXDEPTH and the other settings in fourinarow.py.
+#
+# Each player is a personality followed by any settings, separated by colons:
+#   negamax                       the default settings from fourinarow.py
+#   negamax:thinktime=100         think for 100 milliseconds per move
+#   negamax:maxdepth=6:book=0     look 6 moves ahead, don't use the opening book
+#   classic                       the CLASSIC personality
+#
+# Usage: python fourinarow_tournament.py negamax:thinktime=50 classic --games 100
+
+import argparse, multiprocessing, os, random, time
+os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = '1' # importing pygame is fine, but keep it quiet
+import fourinarow
+from fourinarow import RED, BLACK
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Play Four in a Row computer players against each other.')
+    parser.add_argument('players', nargs='+', help='players, e.g. negamax:thinktime=100 or classic')
+    parser.add_argument('--games', type=int, default=100, help='games for each pair of players')
+    parser.add_argument('--processes', type=int, default=multiprocessing.cpu_count(), help='games to play at once')
+    parser.add_argument('--random-moves', type=int, default=2, help='random moves at the start of each game, for variety')
+    parser.add_argument('--seed', type=int, default=None, help='random seed, for repeatable tournaments')
+    args = parser.parse_args()
+
+    names = args.players
+    if len(names) == 1:
+        names = names * 2 # a player against itself
+    players = [parsePlayer(name) for name in names]
+    rng = random.Random(args.seed)
+
+    # Every pair of players plays the same number of games, taking turns
+    # to go first.
+    tasks = []
+    for first in range(len(players)):
+        for second in range(first + 1, len(players)):
+            for game in range(args.games):
+                if game % 2 == 0:
+                    tasks.append((players[first], players[second], first, second, args.random_moves, rng.getrandbits(32)))
+                else:
+                    tasks.append((players[second], players[first], second, first, args.random_moves, rng.getrandbits(32)))
+
+    print('Playing %s games with %s processes...' % (len(tasks), args.processes))
+    startTime = time.time()
+    pool = multiprocessing.Pool(args.processes)
+    results = pool.map(playGame, tasks, chunksize=1)
+    pool.close()
+    pool.join()
+    print('Finished in %.1f seconds.' % (time.time() - startTime))
+    printReport(names, results)
+
+
+def parsePlayer(text):
+    # Returns a dictionary of getComputerMove() settings for the player text.
+    parts = text.split(':')
+    player = {'personality': parts[0], 'thinkTime': fourinarow.THINKTIME,
+              'maxDepth': fourinarow.MAXDEPTH, 'useBook': True}
+    if player['personality'] not in (fourinarow.NEGAMAX, fourinarow.CLASSIC):
+        raise SystemExit('Unknown personality: %s' % (player['personality']))
+    for part in parts[1:]:
+        name, value = part.split('=')
+        if name == 'thinktime':
+            player['thinkTime'] = int(value)
+        elif name == 'maxdepth':
+            player['maxDepth'] = int(value)
+        elif name == 'book':
+            player['useBook'] = value not in ('0', 'no', 'false')
+        else:
+            raise SystemExit('Unknown setting: %s' % (name))
+    return player
+
+
+def playGame(task):
+    # Runs in a worker process. Plays one game, where the first player is
+    # RED and moves first. Returns the index of the winning player (None
+    # for a tie) and a list of (player index, seconds, nodes) for each move.
+    firstPlayer, secondPlayer, firstIndex, secondIndex, randomMoves, seed = task
+    random.seed(seed)
+    board = fourinarow.getNewBoard()
+    players = {RED: (firstPlayer, firstIndex), BLACK: (secondPlayer, secondIndex)}
+    # Each player has its own transposition table for the whole game.
+    tables = {}
+    for tile in (RED, BLACK):
+        fourinarow.resetTranspositionTable()
+        tables[tile] = dict(fourinarow.TRANSTABLE)
+
+    moves = []
+    tile = RED
+    for moveNum in range(fourinarow.BOARDWIDTH * fourinarow.BOARDHEIGHT):
+        player, index = players[tile]
+        if moveNum < randomMoves:
+            column = random.choice([x for x in range(fourinarow.BOARDWIDTH) if fourinarow.isValidMove(board, x)])
+        else:
+            fourinarow.TRANSTABLE.update(tables[tile])
+            startTime = time.time()
+            # getComputerMove() always plays BLACK, so RED sees the board
+            # with the colors swapped.
+            column = fourinarow.getComputerMove(getBoardForBlack(board, tile), player['personality'],
+                                                player['thinkTime'], player['maxDepth'], 1, player['useBook'])
+            moves.append((index, time.time() - startTime, fourinarow.SEARCH['nodes']))
+            tables[tile] = dict(fourinarow.TRANSTABLE)
+        fourinarow.makeMove(board, tile, column)
+        if fourinarow.isWinner(board, tile):
+            return index, moves
+        tile = fourinarow.getEnemyTile(tile)
+    return None, moves # the board is full, so it's a tie
+
+
+def getBoardForBlack(board, tile):
+    # Returns the board as the player with this tile should see it, with
+    # their own tokens BLACK.
+    if tile == BLACK:
+        return board
+    swapped = {RED: BLACK, BLACK: RED, fourinarow.EMPTY: fourinarow.EMPTY}
+    return [[swapped[space] for space in column] for column in board]
+
+
+def printReport(names, results):
+    print()
+    print('%-32s %6s %6s %6s %6s %8s %9s %9s %11s' % ('player', 'games', 'wins', 'losses', 'ties', 'win %',
+                                                       'avg ms', 'max ms', 'nodes/sec'))
+    for index in range(len(names)):
+        games = wins = losses = ties = 0
+        moveTimes = []
+        nodes = 0
+        for winner, moves in results:
+            playerMoves = [move for move in moves if move[0] == index]
+            if not playerMoves:
+                continue # this player wasn't in the game
+            games += 1
+            if winner == index:
+                wins += 1
+            elif winner == None:
+                ties += 1
+            else:
+                losses += 1
+            moveTimes.extend([seconds for player, seconds, moveNodes in playerMoves])
+            nodes += sum([moveNodes for player, seconds, moveNodes in playerMoves])
+        if games == 0:
+            continue
+        averageMs = 1000 * sum(moveTimes) / len(moveTimes)
+        nodesPerSecond = nodes / sum(moveTimes) if sum(moveTimes) > 0 else 0
+        print('%-32s %6s %6s %6s %6s %7.1f%% %9.1f %9.1f %11.0f' % (names[index], games, wins, losses, ties,
+              100.0 * wins / games, averageMs, 1000 * max(moveTimes), nodesPerSecond))
+
+
+if __name__ == '__main__':
+    main()
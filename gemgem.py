@@ -13,9 +13,14 @@ with the following keys:
                 This is the direction the gem is moving.
   'imageNum'  - The integer index into GEMIMAGES to denote which image
                 this gem uses.
+
+The board itself is a NumPy array of small integers, so board[x][y] is
+the imageNum of the gem at that space (or EMPTY_SPACE). Finding matches
+and pulling gems down work on whole rows and columns of the array at once
+instead of looking at one space at a time.
 """
 
-import random, time, pygame, sys, copy
+import random, time, pygame, sys, multiprocessing, numpy
 from pygame.locals import *
 
 FPS = 30 # frames per second to update the screen
@@ -37,6 +42,8 @@ NUMMATCHSOUNDS = 6
 
 MOVERATE = 25 # 1 to 100, larger num means faster animations
 DEDUCTSPEED = 0.8 # reduces score by 1 point every DEDUCTSPEED seconds.
+SWAPTRIALS = 20 # how many random refills getBestSwaps() tries for each swap
+SWAPPROCESSES = multiprocessing.cpu_count() # how many processes getBestSwaps() uses
 
 #             R    G    B
 PURPLE    = (255,   0, 255)
@@ -46,6 +53,7 @@ RED       = (255, 100, 100)
 BLACK     = (  0,   0,   0)
 BROWN     = ( 85,  65,   0)
 HIGHLIGHTCOLOR = PURPLE # color of the selected gem's border
+HINTCOLOR = RED # color of the border of the gems the hint says to swap
 BGCOLOR = LIGHTBLUE # background color on the screen
 GRIDCOLOR = BLUE # color of the game board
 GAMEOVERCOLOR = RED # color of the "Game over" text.
@@ -66,8 +74,16 @@ RIGHT = 'right'
 EMPTY_SPACE = -1 # an arbitrary, nonpositive value
 ROWABOVEBOARD = 'row above board' # an arbitrary, noninteger value
 
+# The worker processes that getBestSwaps() uses, started the first time
+# they're needed.
+WORKERPOOL = {'pool': None, 'processes': 0}
+
+# The board's gems drawn on top of the empty board, and the board and moving
+# gems it was drawn for, so it is only drawn again when they change.
+GEMLAYER = {'key': None, 'surface': None}
+
 def main():
-    global FPSCLOCK, DISPLAYSURF, GEMIMAGES, GAMESOUNDS, BASICFONT, BOARDRECTS
+    global FPSCLOCK, DISPLAYSURF, GEMIMAGES, GAMESOUNDS, BASICFONT, BOARDRECTS, HINTSURF, HINTRECT, BOARDSURF
 
     # Initial set up.
     pygame.init()
@@ -82,7 +98,7 @@ def main():
         gemImage = pygame.image.load('assets/images/gem%s.png' % i)
         if gemImage.get_size() != (GEMIMAGESIZE, GEMIMAGESIZE):
             gemImage = pygame.transform.smoothscale(gemImage, (GEMIMAGESIZE, GEMIMAGESIZE))
-        GEMIMAGES.append(gemImage)
+        GEMIMAGES.append(gemImage.convert_alpha()) # converted images are faster to draw
 
     # Load the sounds.
     GAMESOUNDS = {}
@@ -103,6 +119,19 @@ def main():
                              GEMIMAGESIZE))
             BOARDRECTS[x].append(r)
 
+    # Draw the empty board once. Drawing the board starts with a copy of it.
+    BOARDSURF = pygame.Surface((WINDOWWIDTH, WINDOWHEIGHT)).convert()
+    BOARDSURF.fill(BGCOLOR)
+    for x in range(BOARDWIDTH):
+        for y in range(BOARDHEIGHT):
+            pygame.draw.rect(BOARDSURF, GRIDCOLOR, BOARDRECTS[x][y], 1)
+    GEMLAYER['surface'] = BOARDSURF.copy()
+
+    # Make the "Hint" button in the top right corner.
+    HINTSURF = BASICFONT.render('Hint', 1, SCORECOLOR)
+    HINTRECT = HINTSURF.get_rect()
+    HINTRECT.topright = (WINDOWWIDTH - 10, 4)
+
     while True:
         runGame()
 
@@ -114,14 +143,18 @@ def runGame():
     gameBoard = getBlankBoard()
     score = 0
     fillBoardAndAnimate(gameBoard, [], score) # Drop the initial gems.
+    moveIndex = getMoveIndex(gameBoard)
 
     # initialize variables for the start of a new game
     firstSelectedGem = None
     lastMouseDownX = None
     lastMouseDownY = None
     gameIsOver = False
+    if moveIndex == {}:
+        gameIsOver = True # the new board has no moves at all
     lastScoreDeduction = time.time()
     clickContinueTextSurf = None
+    hintSwap = None # the two spaces to highlight after "Hint" is clicked
 
     while True: # main game loop
         clickedSpace = None
@@ -138,6 +171,9 @@ def runGame():
 
                 if event.pos == (lastMouseDownX, lastMouseDownY):
                     # This event is a mouse click, not the end of a mouse drag.
+                    if HINTRECT.collidepoint(event.pos) and moveIndex != {}:
+                        # Show the swap that makes the biggest match.
+                        hintSwap = max(moveIndex, key=moveIndex.get)
                     clickedSpace = checkForGemClick(event.pos)
                 else:
                     # this is the end of a mouse drag
@@ -163,10 +199,10 @@ def runGame():
                 continue
 
             # Show the swap animation on the screen.
-            boardCopy = getBoardCopyMinusGems(gameBoard, (firstSwappingGem, secondSwappingGem))
-            animateMovingGems(boardCopy, [firstSwappingGem, secondSwappingGem], [], score)
+            animateMovingGems(gameBoard, [firstSwappingGem, secondSwappingGem], [], score)
 
             # Swap the gems in the board data structure.
+            hintSwap = None
             gameBoard[firstSwappingGem['x']][firstSwappingGem['y']] = secondSwappingGem['imageNum']
             gameBoard[secondSwappingGem['x']][secondSwappingGem['y']] = firstSwappingGem['imageNum']
 
@@ -175,12 +211,13 @@ def runGame():
             if matchedGems == []:
                 # Was not a matching move; swap the gems back
                 GAMESOUNDS['bad swap'].play()
-                animateMovingGems(boardCopy, [firstSwappingGem, secondSwappingGem], [], score)
+                animateMovingGems(gameBoard, [firstSwappingGem, secondSwappingGem], [], score)
                 gameBoard[firstSwappingGem['x']][firstSwappingGem['y']] = firstSwappingGem['imageNum']
                 gameBoard[secondSwappingGem['x']][secondSwappingGem['y']] = secondSwappingGem['imageNum']
             else:
                 # This was a matching move.
                 scoreAdd = 0
+                changedColumns = set([firstSwappingGem['x'], secondSwappingGem['x']])
                 while matchedGems != []:
                     # Remove matched gems, then pull down the board.
 
@@ -190,9 +227,10 @@ def runGame():
                     # the playergets multiple matches, then multiple points text should appear.
                     points = []
                     for gemSet in matchedGems:
-                        scoreAdd += (10 + (len(gemSet) - 3) * 10)
+                        scoreAdd += getMatchPoints(gemSet)
                         for gem in gemSet:
                             gameBoard[gem[0]][gem[1]] = EMPTY_SPACE
+                            changedColumns.add(gem[0])
                         points.append({'points': scoreAdd,
                                        'x': gem[0] * GEMIMAGESIZE + XMARGIN,
                                        'y': gem[1] * GEMIMAGESIZE + YMARGIN})
@@ -204,16 +242,24 @@ def runGame():
 
                     # Check if there are any new matches.
                     matchedGems = findMatchingGems(gameBoard)
+
+                # Only the swaps near the columns that changed need to be
+                # checked again.
+                updateMoveIndex(gameBoard, moveIndex, changedColumns)
             firstSelectedGem = None
 
-            if not canMakeMove(gameBoard):
+            if moveIndex == {}:
                 gameIsOver = True
 
         # Draw the board.
-        DISPLAYSURF.fill(BGCOLOR)
         drawBoard(gameBoard)
+        if hintSwap != None and not gameIsOver:
+            for x, y in hintSwap:
+                highlightSpace(x, y, HINTCOLOR)
         if firstSelectedGem != None:
             highlightSpace(firstSelectedGem['x'], firstSelectedGem['y'])
+        if not gameIsOver:
+            DISPLAYSURF.blit(HINTSURF, HINTRECT)
         if gameIsOver:
             if clickContinueTextSurf == None:
                 # Only render the text once. In future iterations, just
@@ -263,62 +309,80 @@ def getSwappingGems(board, firstXY, secondXY):
 
 def getBlankBoard():
     # Create and return a blank board data structure.
-    board = []
-    for x in range(BOARDWIDTH):
-        board.append([EMPTY_SPACE] * BOARDHEIGHT)
-    return board
-
-
-def canMakeMove(board):
-    # Return True if the board is in a state where a matching
-    # move can be made on it. Otherwise return False.
-
-    # The patterns in oneOffPatterns represent gems that are configured
-    # in a way where it only takes one move to make a triplet.
-    oneOffPatterns = (((0,1), (1,0), (2,0)),
-                      ((0,1), (1,1), (2,0)),
-                      ((0,0), (1,1), (2,0)),
-                      ((0,1), (1,0), (2,1)),
-                      ((0,0), (1,0), (2,1)),
-                      ((0,0), (1,1), (2,1)),
-                      ((0,0), (0,2), (0,3)),
-                      ((0,0), (0,1), (0,3)))
-
-    # The x and y variables iterate over each space on the board.
-    # If we use + to represent the currently iterated space on the
-    # board, then this pattern: ((0,1), (1,0), (2,0))refers to identical
-    # gems being set up like this:
-    #
-    #     +A
-    #     B
-    #     C
-    #
-    # That is, gem A is offset from the + by (0,1), gem B is offset
-    # by (1,0), and gem C is offset by (2,0). In this case, gem A can
-    # be swapped to the left to form a vertical three-in-a-row triplet.
-    #
-    # There are eight possible ways for the gems to be one move
-    # away from forming a triple, hence oneOffPattern has 8 patterns.
-
-    for x in range(BOARDWIDTH):
+    return numpy.full((BOARDWIDTH, BOARDHEIGHT), EMPTY_SPACE, dtype=numpy.int8)
+
+
+def getMoveIndex(board):
+    # Returns a dictionary of every swap that can be made on the board that
+    # makes a match. The keys are ((x1, y1), (x2, y2)) tuples of the two
+    # spaces, where the second space is right of or below the first, and
+    # the values are how many gems the swap matches right away.
+    moveIndex = {}
+    updateMoveIndex(board, moveIndex, range(BOARDWIDTH))
+    return moveIndex
+
+
+def updateMoveIndex(board, moveIndex, changedColumns):
+    # Updates the move index after the gems in changedColumns have changed.
+    # A swap can only make a match with gems up to 2 spaces away from the
+    # swapped gems, so only swaps whose first space is from 3 columns left
+    # to 2 columns right of a changed column need to be checked again.
+    columnsToCheck = set()
+    for column in changedColumns:
+        columnsToCheck.update(range(max(0, column - 3), min(BOARDWIDTH, column + 3)))
+
+    for swap in list(moveIndex):
+        if swap[0][0] in columnsToCheck:
+            del moveIndex[swap]
+    for x in columnsToCheck:
         for y in range(BOARDHEIGHT):
-            for pat in oneOffPatterns:
-                # check each possible pattern of "match in next move" to
-                # see if a possible move can be made.
-                if (getGemAt(board, x+pat[0][0], y+pat[0][1]) == \
-                    getGemAt(board, x+pat[1][0], y+pat[1][1]) == \
-                    getGemAt(board, x+pat[2][0], y+pat[2][1]) != None) or \
-                   (getGemAt(board, x+pat[0][1], y+pat[0][0]) == \
-                    getGemAt(board, x+pat[1][1], y+pat[1][0]) == \
-                    getGemAt(board, x+pat[2][1], y+pat[2][0]) != None):
-                    return True # return True the first time you find a pattern
-    return False
-
-
-def drawMovingGem(gem, progress):
-    # Draw a gem sliding in the direction that its 'direction' key
-    # indicates. The progress parameter is a number from 0 (just
-    # starting) to 100 (slide complete).
+            # Try swapping with the gem to the right and the gem below.
+            for otherX, otherY in ((x + 1, y), (x, y + 1)):
+                if otherX < BOARDWIDTH and otherY < BOARDHEIGHT:
+                    matchSize = getSwapMatchSize(board, x, y, otherX, otherY)
+                    if matchSize > 0:
+                        moveIndex[((x, y), (otherX, otherY))] = matchSize
+
+
+def getSwapMatchSize(board, x1, y1, x2, y2):
+    # Returns how many gems would be matched by swapping the gems at these
+    # two spaces, or 0 if the swap wouldn't make a match.
+    if board[x1][y1] == board[x2][y2]:
+        return 0 # swapping two of the same gem doesn't change anything
+    board[x1][y1], board[x2][y2] = board[x2][y2], board[x1][y1]
+    matchSize = getMatchSizeAt(board, x1, y1) + getMatchSizeAt(board, x2, y2)
+    board[x1][y1], board[x2][y2] = board[x2][y2], board[x1][y1] # swap back
+    return matchSize
+
+
+def getMatchSizeAt(board, x, y):
+    # Returns how many gems are in the horizontal and vertical rows of 3 or
+    # more that go through the gem at x, y.
+    gem = getGemAt(board, x, y)
+    if gem == EMPTY_SPACE:
+        return 0
+    matchSize = 0
+    rowsMatched = 0
+    for offsetX, offsetY in ((1, 0), (0, 1)):
+        # Count the identical gems on both sides of x, y in this direction.
+        length = 1
+        for sign in (1, -1):
+            distance = 1
+            while getGemAt(board, x + offsetX * distance * sign, y + offsetY * distance * sign) == gem:
+                length += 1
+                distance += 1
+        if length >= 3:
+            matchSize += length
+            rowsMatched += 1
+    if rowsMatched == 2:
+        matchSize -= 1 # don't count the gem at x, y in both rows
+    return matchSize
+
+
+def getMovingGemRect(gem, progress):
+    # Returns the Rect of a gem sliding in the direction that its
+    # 'direction' key indicates. The progress parameter is a number from 0
+    # (just starting) to 100 (slide complete).
     movex = 0
     movey = 0
     progress *= 0.01
@@ -339,98 +403,187 @@ def drawMovingGem(gem, progress):
 
     pixelx = XMARGIN + (basex * GEMIMAGESIZE)
     pixely = YMARGIN + (basey * GEMIMAGESIZE)
-    r = pygame.Rect( (pixelx + movex, pixely + movey, GEMIMAGESIZE, GEMIMAGESIZE) )
-    DISPLAYSURF.blit(GEMIMAGES[gem['imageNum']], r)
+    return pygame.Rect( (pixelx + movex, pixely + movey, GEMIMAGESIZE, GEMIMAGESIZE) )
 
 
 def pullDownAllGems(board):
     # pulls down gems on the board to the bottom to fill in any gaps
-    for x in range(BOARDWIDTH):
-        gemsInColumn = []
-        for y in range(BOARDHEIGHT):
-            if board[x][y] != EMPTY_SPACE:
-                gemsInColumn.append(board[x][y])
-        board[x] = ([EMPTY_SPACE] * (BOARDHEIGHT - len(gemsInColumn))) + gemsInColumn
+    # Sorting each column by "is this space a gem?" puts the empty spaces
+    # (False) on top and the gems (True) below them. A stable sort keeps
+    # the gems in the same order they were in.
+    order = numpy.argsort(board != EMPTY_SPACE, axis=1, kind='stable')
+    board[:] = numpy.take_along_axis(board, order, axis=1)
 
 
 def getGemAt(board, x, y):
     if x < 0 or y < 0 or x >= BOARDWIDTH or y >= BOARDHEIGHT:
         return None
     else:
-        return board[x][y]
+        return int(board[x][y])
 
 
-def getDropSlots(board):
+def getDropSlots(board, rng=random):
     # Creates a "drop slot" for each column and fills the slot with a
     # number of gems that that column is lacking. This function assumes
     # that the gems have been gravity dropped already.
-    boardCopy = copy.deepcopy(board)
+    boardCopy = board.copy()
     pullDownAllGems(boardCopy)
 
     dropSlots = []
     for i in range(BOARDWIDTH):
         dropSlots.append([])
 
-    # count the number of empty spaces in each column on the board
+    # count the number of empty spaces in each column on the board. After
+    # pulling down, they are all at the top of the column.
+    emptyCounts = numpy.count_nonzero(boardCopy == EMPTY_SPACE, axis=1)
     for x in range(BOARDWIDTH):
-        for y in range(BOARDHEIGHT-1, -1, -1): # start from bottom, going up
-            if boardCopy[x][y] == EMPTY_SPACE:
-                possibleGems = list(range(len(GEMIMAGES)))
-                for offsetX, offsetY in ((0, -1), (1, 0), (0, 1), (-1, 0)):
-                    # Narrow down the possible gems we should put in the
-                    # blank space so we don't end up putting an two of
-                    # the same gems next to each other when they drop.
-                    neighborGem = getGemAt(boardCopy, x + offsetX, y + offsetY)
-                    if neighborGem != None and neighborGem in possibleGems:
-                        possibleGems.remove(neighborGem)
-
-                newGem = random.choice(possibleGems)
-                boardCopy[x][y] = newGem
-                dropSlots[x].append(newGem)
+        for y in range(emptyCounts[x] - 1, -1, -1): # start from bottom, going up
+            possibleGems = list(range(NUMGEMIMAGES))
+            for offsetX, offsetY in ((0, -1), (1, 0), (0, 1), (-1, 0)):
+                # Narrow down the possible gems we should put in the
+                # blank space so we don't end up putting an two of
+                # the same gems next to each other when they drop.
+                neighborGem = getGemAt(boardCopy, x + offsetX, y + offsetY)
+                if neighborGem != None and neighborGem in possibleGems:
+                    possibleGems.remove(neighborGem)
+
+            newGem = rng.choice(possibleGems)
+            boardCopy[x][y] = newGem
+            dropSlots[x].append(newGem)
     return dropSlots
 
 
 def findMatchingGems(board):
-    gemsToRemove = [] # a list of lists of gems in matching triplets that should be removed
-    boardCopy = copy.deepcopy(board)
+    # Returns a list of lists of gems in matching rows of 3 or more that
+    # should be removed. Each list is one horizontal or vertical row of
+    # (x, y) tuples, so a gem in both a horizontal and a vertical row is in
+    # two of the lists.
+    gemsToRemove = []
+
+    # board.T is the board flipped so that its columns are rows, so the
+    # same function finds both the horizontal and the vertical matches.
+    for x, y, length in getMatchingRuns(board):
+        gemsToRemove.append([(x + offset, y) for offset in range(length)])
+    for y, x, length in getMatchingRuns(board.T):
+        gemsToRemove.append([(x, y + offset) for offset in range(length)])
+    return gemsToRemove
 
-    # loop through each space, checking for 3 adjacent identical gems
-    for x in range(BOARDWIDTH):
-        for y in range(BOARDHEIGHT):
-            # look for horizontal matches
-            if getGemAt(boardCopy, x, y) == getGemAt(boardCopy, x + 1, y) == getGemAt(boardCopy, x + 2, y) and getGemAt(boardCopy, x, y) != EMPTY_SPACE:
-                targetGem = boardCopy[x][y]
-                offset = 0
-                removeSet = []
-                while getGemAt(boardCopy, x + offset, y) == targetGem:
-                    # keep checking if there's more than 3 gems in a row
-                    removeSet.append((x + offset, y))
-                    boardCopy[x + offset][y] = EMPTY_SPACE
-                    offset += 1
-                gemsToRemove.append(removeSet)
-
-            # look for vertical matches
-            if getGemAt(boardCopy, x, y) == getGemAt(boardCopy, x, y + 1) == getGemAt(boardCopy, x, y + 2) and getGemAt(boardCopy, x, y) != EMPTY_SPACE:
-                targetGem = boardCopy[x][y]
-                offset = 0
-                removeSet = []
-                while getGemAt(boardCopy, x, y + offset) == targetGem:
-                    # keep checking, in case there's more than 3 gems in a row
-                    removeSet.append((x, y + offset))
-                    boardCopy[x][y + offset] = EMPTY_SPACE
-                    offset += 1
-                gemsToRemove.append(removeSet)
 
-    return gemsToRemove
+def getMatchingRuns(board):
+    # Finds the runs of 3 or more identical gems along the first index of
+    # the board array (left to right across the board). Returns a list of
+    # (first index, second index, length) tuples for where each run starts.
+    # sameAsNext[i][j] is True if the gem at i,j is the same as at i+1,j.
+    sameAsNext = (board[:-1] == board[1:]) & (board[:-1] != EMPTY_SPACE)
+    # A triplet starts at i,j if the next two gems are both the same as it.
+    tripletStarts = sameAsNext[:-1] & sameAsNext[1:]
+    matched = numpy.zeros(board.shape, dtype=bool)
+    for offset in range(3):
+        matched[offset:offset + len(tripletStarts)] |= tripletStarts
+
+    # A run starts at a matched gem unless the gem before it is a matched
+    # gem of the same kind, and ends the same way with the gem after it.
+    continuesRun = matched[:-1] & matched[1:] & sameAsNext
+    startsRun = matched.copy()
+    startsRun[1:] &= ~continuesRun
+    endsRun = matched.copy()
+    endsRun[:-1] &= ~continuesRun
+
+    # Going through the starts and ends line by line puts them in the same
+    # order, so each start pairs up with its end.
+    starts = numpy.argwhere(startsRun.T)
+    ends = numpy.argwhere(endsRun.T)
+    return [(int(i), int(j), int(end - i + 1)) for (j, i), end in zip(starts, ends[:, 1])]
+
+
+def getMatchPoints(gemSet):
+    # Returns how many points matching this row of gems is worth.
+    return 10 + (len(gemSet) - 3) * 10
+
+
+def simulateSwap(board, firstXY, secondXY, rng=random):
+    # Swaps the gems at the two (x, y) spaces on a copy of the board and
+    # plays out all the matches that follow, scoring them the same way
+    # runGame() does but without any animation. New gems are picked with
+    # rng, so a random.Random with a seed gives the same gems every time.
+    # Returns the points scored and the board afterwards.
+    board = board.copy()
+    (x1, y1), (x2, y2) = firstXY, secondXY
+    board[x1][y1], board[x2][y2] = board[x2][y2], board[x1][y1]
 
+    score = 0
+    scoreAdd = 0
+    matchedGems = findMatchingGems(board)
+    while matchedGems != []:
+        for gemSet in matchedGems:
+            scoreAdd += getMatchPoints(gemSet)
+            for gem in gemSet:
+                board[gem[0]][gem[1]] = EMPTY_SPACE
+        score += scoreAdd
+
+        # Drop the new gems straight into place.
+        dropSlots = getDropSlots(board, rng)
+        pullDownAllGems(board)
+        for x in range(BOARDWIDTH):
+            for i in range(len(dropSlots[x])):
+                # The first gem in the drop slot lands the lowest.
+                board[x][len(dropSlots[x]) - 1 - i] = dropSlots[x][i]
+        matchedGems = findMatchingGems(board)
+    return score, board
+
+
+def getBestSwaps(board, trials=SWAPTRIALS, processes=SWAPPROCESSES, seed=None):
+    # Returns a list of (expected points, swap) tuples for every swap that
+    # makes a match, best first. Each swap is simulated trials times with
+    # different random new gems, and the expected points are the average.
+    # The swaps are split up between processes worker processes.
+    rng = random.Random(seed)
+    seeds = [rng.getrandbits(32) for i in range(trials)]
+    # Every swap is tried with the same new gems, so that luck doesn't
+    # decide which swap looks best.
+    tasks = [(board, swap, seeds) for swap in getMoveIndex(board)]
+    if processes > 1:
+        results = getWorkerPool(processes).map(getExpectedPoints, tasks)
+    else:
+        results = [getExpectedPoints(task) for task in tasks]
+    return sorted(zip(results, [task[1] for task in tasks]), reverse=True)
 
-def highlightSpace(x, y):
-    pygame.draw.rect(DISPLAYSURF, HIGHLIGHTCOLOR, BOARDRECTS[x][y], 4)
+
+def getExpectedPoints(task):
+    # Runs in a worker process. Returns the average points the swap scores
+    # over the random seeds.
+    board, swap, seeds = task
+    totalPoints = 0
+    for seed in seeds:
+        totalPoints += simulateSwap(board, swap[0], swap[1], random.Random(seed))[0]
+    return totalPoints / len(seeds)
+
+
+def getWorkerPool(processes):
+    # Returns the pool of worker processes, starting it if needed.
+    if WORKERPOOL['pool'] == None or WORKERPOOL['processes'] != processes:
+        closeWorkerPool()
+        WORKERPOOL['pool'] = multiprocessing.Pool(processes)
+        WORKERPOOL['processes'] = processes
+    return WORKERPOOL['pool']
+
+
+def closeWorkerPool():
+    # Stops the worker processes.
+    if WORKERPOOL['pool'] != None:
+        WORKERPOOL['pool'].terminate()
+        WORKERPOOL['pool'].join()
+        WORKERPOOL['pool'] = None
+        WORKERPOOL['processes'] = 0
+
+
+def highlightSpace(x, y, color=HIGHLIGHTCOLOR):
+    pygame.draw.rect(DISPLAYSURF, color, BOARDRECTS[x][y], 4)
 
 
 def getDroppingGems(board):
     # Find all the gems that have an empty space below them
-    boardCopy = copy.deepcopy(board)
+    boardCopy = board.copy()
     droppingGems = []
     for x in range(BOARDWIDTH):
         for y in range(BOARDHEIGHT - 2, -1, -1):
@@ -442,21 +595,39 @@ def getDroppingGems(board):
 
 
 def animateMovingGems(board, gems, pointsText, score):
+    # Slides the gems in the gems list across the board. The spaces they
+    # are moving from are drawn empty.
     # pointsText is a dictionary with keys 'x', 'y', and 'points'
+    gemLayer = getGemLayer(board, gems)
+    DISPLAYSURF.blit(gemLayer, (0, 0))
+    drawScore(score)
+    pointsSurfs = []
+    for pointText in pointsText:
+        pointsSurf = BASICFONT.render(str(pointText['points']), 1, SCORECOLOR)
+        pointsRect = pointsSurf.get_rect()
+        pointsRect.center = (pointText['x'], pointText['y'])
+        pointsSurfs.append((pointsSurf, pointsRect))
+
+    # Only the moving gems change between frames, so each frame erases them
+    # (by copying the board under them back) and draws them in their new
+    # place, and only those parts of the window are updated.
+    oldRects = None
     progress = 0 # progress at 0 represents beginning, 100 means finished.
     while progress < 100: # animation loop
-        DISPLAYSURF.fill(BGCOLOR)
-        drawBoard(board)
-        for gem in gems: # Draw each gem.
-            drawMovingGem(gem, progress)
-        drawScore(score)
-        for pointText in pointsText:
-            pointsSurf = BASICFONT.render(str(pointText['points']), 1, SCORECOLOR)
-            pointsRect = pointsSurf.get_rect()
-            pointsRect.center = (pointText['x'], pointText['y'])
-            DISPLAYSURF.blit(pointsSurf, pointsRect)
-
-        pygame.display.update()
+        newRects = [getMovingGemRect(gem, progress) for gem in gems]
+        if oldRects != None:
+            for rect in oldRects + [pointsRect for pointsSurf, pointsRect in pointsSurfs]:
+                DISPLAYSURF.blit(gemLayer, rect, rect)
+        for gem, rect in zip(gems, newRects): # Draw each gem.
+            DISPLAYSURF.blit(GEMIMAGES[gem['imageNum']], rect)
+        for pointsSurf, pointsRect in pointsSurfs:
+            DISPLAYSURF.blit(pointsSurf, pointsRect) # the points go on top of the gems
+
+        if oldRects == None:
+            pygame.display.update() # the first frame draws the whole board
+        else:
+            pygame.display.update(oldRects + newRects + [pointsRect for pointsSurf, pointsRect in pointsSurfs])
+        oldRects = newRects
         FPSCLOCK.tick(FPS)
         progress += MOVERATE # progress the animation a little bit more for the next frame
 
@@ -492,8 +663,7 @@ def fillBoardAndAnimate(board, points, score):
                 # cause the lowest gem in each slot to begin moving in the DOWN direction
                 movingGems.append({'imageNum': dropSlots[x][0], 'x': x, 'y': ROWABOVEBOARD, 'direction': DOWN})
 
-        boardCopy = getBoardCopyMinusGems(board, movingGems)
-        animateMovingGems(boardCopy, movingGems, points, score)
+        animateMovingGems(board, movingGems, points, score)
         moveGems(board, movingGems)
 
         # Make the next row of gems from the drop slots
@@ -515,27 +685,26 @@ def checkForGemClick(pos):
 
 
 def drawBoard(board):
-    for x in range(BOARDWIDTH):
-        for y in range(BOARDHEIGHT):
-            pygame.draw.rect(DISPLAYSURF, GRIDCOLOR, BOARDRECTS[x][y], 1)
-            gemToDraw = board[x][y]
-            if gemToDraw != EMPTY_SPACE:
-                DISPLAYSURF.blit(GEMIMAGES[gemToDraw], BOARDRECTS[x][y])
-
-
-def getBoardCopyMinusGems(board, gems):
-    # Creates and returns a copy of the passed board data structure,
-    # with the gems in the "gems" list removed from it.
-    #
-    # Gems is a list of dicts, with keys x, y, direction, imageNum
-
-    boardCopy = copy.deepcopy(board)
-
-    # Remove some of the gems from this board data structure copy.
-    for gem in gems:
-        if gem['y'] != ROWABOVEBOARD:
-            boardCopy[gem['x']][gem['y']] = EMPTY_SPACE
-    return boardCopy
+    DISPLAYSURF.blit(getGemLayer(board), (0, 0))
+
+
+def getGemLayer(board, movingGems=()):
+    # Returns a Surface of the whole window with the board and its gems
+    # drawn on it, leaving out the gems in movingGems (a list of dicts, with
+    # keys x, y, direction, imageNum). The Surface is only drawn again when
+    # the board or the moving gems are different from last time.
+    movingSpaces = tuple([(gem['x'], gem['y']) for gem in movingGems if gem['y'] != ROWABOVEBOARD])
+    key = (board.tobytes(), movingSpaces)
+    if GEMLAYER['key'] != key:
+        gemLayer = GEMLAYER['surface']
+        gemLayer.blit(BOARDSURF, (0, 0))
+        for x in range(BOARDWIDTH):
+            for y in range(BOARDHEIGHT):
+                gemToDraw = board[x][y]
+                if gemToDraw != EMPTY_SPACE and (x, y) not in movingSpaces:
+                    gemLayer.blit(GEMIMAGES[gemToDraw], BOARDRECTS[x][y])
+        GEMLAYER['key'] = key
+    return GEMLAYER['surface']
 
 
 def drawScore(score):
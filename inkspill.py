@@ -3,7 +3,7 @@
 # By Al Sweigart al@inventwithpython.com
 # Released under a "Simplified BSD" license
 
-import random, sys, webbrowser, copy, pygame
+import random, sys, webbrowser, pygame
 from pygame.locals import *
 
 # There are different box sizes, number of boxes, and
@@ -11,14 +11,17 @@ from pygame.locals import *
 SMALLBOXSIZE  = 60 # size is in pixels
 MEDIUMBOXSIZE = 20
 LARGEBOXSIZE  = 11
+MARATHONBOXSIZE = 3
 
 SMALLBOARDSIZE  = 6 # size is in boxes
 MEDIUMBOARDSIZE = 17
 LARGEBOARDSIZE  = 30
+MARATHONBOARDSIZE = 100
 
 SMALLMAXLIFE  = 10 # number of turns
 MEDIUMMAXLIFE = 30
 LARGEMAXLIFE  = 64
+MARATHONMAXLIFE = 220
 
 FPS = 30
 WINDOWWIDTH = 640
@@ -29,6 +32,7 @@ PALETTESIZE = 45
 EASY = 0   # arbitrary but unique value
 MEDIUM = 1 # arbitrary but unique value
 HARD = 2   # arbitrary but unique value
+SOLVERBEAMWIDTH = 50 # how many positions the solver keeps after each move; more is slower but finds shorter solutions
 
 difficulty = MEDIUM # game starts in "medium" mode
 maxLife = MEDIUMMAXLIFE
@@ -59,13 +63,24 @@ for i in range(len(COLORSCHEMES)):
 bgColor = COLORSCHEMES[0][0]
 paletteColors =  COLORSCHEMES[0][1:]
 
+# The board drawn with one pixel for each box ('cells'), and scaled up to
+# the size it is on the screen ('scaled'). Only the pixels of boxes that
+# change color are drawn again. 'board', 'palette' and 'boxSize' are what
+# the image was drawn for, so it can be drawn from scratch when they change.
+BOARDIMAGE = {'board': None, 'palette': None, 'boxSize': None, 'cells': None, 'scaled': None, 'oldScaled': None}
+
 def main():
-    global FPSCLOCK, DISPLAYSURF, LOGOIMAGE, SPOTIMAGE, SETTINGSIMAGE, SETTINGSBUTTONIMAGE, RESETBUTTONIMAGE
+    global FPSCLOCK, DISPLAYSURF, LOGOIMAGE, SPOTIMAGE, SETTINGSIMAGE, SETTINGSBUTTONIMAGE, RESETBUTTONIMAGE, MARATHONIMAGE, FLASHSURF, ORIGSURF
 
     pygame.init()
     FPSCLOCK = pygame.time.Clock()
     DISPLAYSURF = pygame.display.set_mode((WINDOWWIDTH, WINDOWHEIGHT))
 
+    # Make the surfaces for flashBorderAnimation() once, instead of for
+    # every flash.
+    FLASHSURF = pygame.Surface(DISPLAYSURF.get_size()).convert_alpha()
+    ORIGSURF = DISPLAYSURF.copy()
+
     # Load images
     LOGOIMAGE = pygame.image.load('assets/images/inkspilllogo.png')
     SPOTIMAGE = pygame.image.load('assets/images/inkspillspot.png')
@@ -73,10 +88,15 @@ def main():
     SETTINGSBUTTONIMAGE = pygame.image.load('assets/images/inkspillsettingsbutton.png')
     RESETBUTTONIMAGE = pygame.image.load('assets/images/inkspillresetbutton.png')
 
+    # The settings image doesn't have the marathon board size, so make a
+    # button for it under the other sizes.
+    MARATHONIMAGE = pygame.font.Font('freesansbold.ttf', 26).render('Marathon', True, WHITE)
+
     pygame.display.set_caption('Ink Spill')
     mousex = 0
     mousey = 0
-    mainBoard = generateRandomBoard(boardWidth, boardHeight, difficulty)
+    mainBoard = generateSolvableBoard(boardWidth, boardHeight, difficulty, maxLife)
+    regionGraph = getRegionGraph(mainBoard)
     life = maxLife
     lastPaletteClicked = None
 
@@ -124,10 +144,11 @@ def main():
             # from accidentally clicking the same palette twice)
             lastPaletteClicked = paletteClicked
             floodAnimation(mainBoard, paletteClicked)
+            floodRegionGraph(regionGraph, paletteClicked)
             life -= 1
 
             resetGame = False
-            if hasWon(mainBoard):
+            if hasWon(regionGraph):
                 for i in range(4): # flash border 4 times
                     flashBorderAnimation(WHITE, mainBoard)
                 resetGame = True
@@ -144,7 +165,8 @@ def main():
 
         if resetGame:
             # start a new game
-            mainBoard = generateRandomBoard(boardWidth, boardHeight, difficulty)
+            mainBoard = generateSolvableBoard(boardWidth, boardHeight, difficulty, maxLife)
+            regionGraph = getRegionGraph(mainBoard)
             life = maxLife
             lastPaletteClicked = None
 
@@ -164,13 +186,117 @@ def checkForQuit():
         pygame.event.post(event) # put the other KEYUP event objects back
 
 
-def hasWon(board):
-    # if the entire board is the same color, player has won
+def hasWon(regionGraph):
+    # if the entire board is one region of the same color, player has won
+    return len(regionGraph['color']) == 1
+
+
+def getRegionGraph(board):
+    # Groups the boxes of the board into regions of touching boxes that are
+    # the same color, and returns a "region graph" dictionary with keys:
+    #   'parent'    - a list with a box number for each box on the board,
+    #                 where box number x * boardHeight + y is the box at x, y.
+    #                 Following the parents from a box leads to its region.
+    #   'color'     - a dictionary of region to its color.
+    #   'size'      - a dictionary of region to how many boxes it has.
+    #   'neighbors' - a dictionary of region to a set of the regions that
+    #                 touch it.
+    #   'main'      - the region with the top left box, which is the region
+    #                 the player floods.
+    # Each region is named by the box number of one of its boxes.
+    parent = list(range(boardWidth * boardHeight))
+    regionGraph = {'parent': parent, 'color': {}, 'size': {}, 'neighbors': {}, 'main': 0}
+
+    # Join each box with the boxes right of and below it that are the
+    # same color.
     for x in range(boardWidth):
         for y in range(boardHeight):
-            if board[x][y] != board[0][0]:
-                return False # found a different color, player has not won
-    return True
+            if x < boardWidth - 1 and board[x + 1][y] == board[x][y]:
+                joinBoxes(regionGraph, x * boardHeight + y, (x + 1) * boardHeight + y)
+            if y < boardHeight - 1 and board[x][y + 1] == board[x][y]:
+                joinBoxes(regionGraph, x * boardHeight + y, x * boardHeight + y + 1)
+
+    for x in range(boardWidth):
+        for y in range(boardHeight):
+            region = getRegion(regionGraph, x * boardHeight + y)
+            if region not in regionGraph['color']:
+                regionGraph['color'][region] = board[x][y]
+                regionGraph['size'][region] = 0
+                regionGraph['neighbors'][region] = set()
+            regionGraph['size'][region] += 1
+    for x in range(boardWidth):
+        for y in range(boardHeight):
+            # Boxes next to each other that are different colors are in
+            # neighboring regions.
+            region = getRegion(regionGraph, x * boardHeight + y)
+            if x < boardWidth - 1 and board[x + 1][y] != board[x][y]:
+                otherRegion = getRegion(regionGraph, (x + 1) * boardHeight + y)
+                regionGraph['neighbors'][region].add(otherRegion)
+                regionGraph['neighbors'][otherRegion].add(region)
+            if y < boardHeight - 1 and board[x][y + 1] != board[x][y]:
+                otherRegion = getRegion(regionGraph, x * boardHeight + y + 1)
+                regionGraph['neighbors'][region].add(otherRegion)
+                regionGraph['neighbors'][otherRegion].add(region)
+    regionGraph['main'] = getRegion(regionGraph, 0)
+    return regionGraph
+
+
+def getRegion(regionGraph, box):
+    # Returns the region that the box number is in. (This is the "find" of
+    # union-find.)
+    parent = regionGraph['parent']
+    while parent[box] != box:
+        parent[box] = parent[parent[box]] # skip ahead, so the next find is quicker
+        box = parent[box]
+    return box
+
+
+def joinBoxes(regionGraph, box, otherBox):
+    # Puts the regions of the two box numbers together while the graph is
+    # being made. (This is the "union" of union-find.)
+    region = getRegion(regionGraph, box)
+    otherRegion = getRegion(regionGraph, otherBox)
+    if region != otherRegion:
+        regionGraph['parent'][otherRegion] = region
+
+
+def floodRegionGraph(regionGraph, newColor):
+    # Changes the main region to newColor, and merges it with each of its
+    # neighboring regions that are that color. Only the main region's
+    # neighbors are looked at, not the whole board. Returns a list of the
+    # regions that were merged into the main region.
+    main = regionGraph['main']
+    if regionGraph['color'][main] == newColor:
+        return []
+    regionGraph['color'][main] = newColor
+    mergedRegions = [region for region in regionGraph['neighbors'][main] if regionGraph['color'][region] == newColor]
+    for region in mergedRegions:
+        main = mergeRegions(regionGraph, main, region)
+    regionGraph['main'] = main
+    return mergedRegions
+
+
+def mergeRegions(regionGraph, region, otherRegion):
+    # Merges two neighboring regions of the same color into one, and
+    # returns the region they are now. The smaller region is merged into
+    # the bigger one, so the fewest neighbor sets need changing.
+    size = regionGraph['size']
+    if size[region] < size[otherRegion]:
+        region, otherRegion = otherRegion, region
+    regionGraph['parent'][otherRegion] = region
+    size[region] += size[otherRegion]
+
+    # The other region's neighbors are now the merged region's neighbors.
+    neighbors = regionGraph['neighbors']
+    for neighbor in neighbors[otherRegion]:
+        neighbors[neighbor].discard(otherRegion)
+        if neighbor != region:
+            neighbors[neighbor].add(region)
+            neighbors[region].add(neighbor)
+    del neighbors[otherRegion]
+    del size[otherRegion]
+    del regionGraph['color'][otherRegion]
+    return region
 
 
 def showSettingsScreen():
@@ -204,6 +330,9 @@ def showSettingsScreen():
                 DISPLAYSURF.blit(SPOTIMAGE, (11, 185))
             if boxSize == LARGEBOXSIZE:
                 DISPLAYSURF.blit(SPOTIMAGE, (24, 220))
+            if boxSize == MARATHONBOXSIZE:
+                DISPLAYSURF.blit(SPOTIMAGE, (0, 258))
+            DISPLAYSURF.blit(MARATHONIMAGE, (44, 266))
 
             for i in range(len(COLORSCHEMES)):
                 drawColorSchemeBoxes(500, i * 60 + 30, i)
@@ -250,6 +379,12 @@ def showSettingsScreen():
                     boardWidth = LARGEBOARDSIZE
                     boardHeight = LARGEBOARDSIZE
                     maxLife = LARGEMAXLIFE
+                elif pygame.Rect(44, 266, MARATHONIMAGE.get_width(), MARATHONIMAGE.get_height()).collidepoint(mousex, mousey):
+                    # marathon board size setting:
+                    boxSize = MARATHONBOXSIZE
+                    boardWidth = MARATHONBOARDSIZE
+                    boardHeight = MARATHONBOARDSIZE
+                    maxLife = MARATHONMAXLIFE
                 elif pygame.Rect(14, 299, 371, 97).collidepoint(mousex, mousey):
                     # clicked on the "learn programming" ad
                     webbrowser.open('http://inventwithpython.com') # opens a web browser
@@ -275,9 +410,9 @@ def drawColorSchemeBoxes(x, y, schemeNum):
 
 
 def flashBorderAnimation(color, board, animationSpeed=30):
-    origSurf = DISPLAYSURF.copy()
-    flashSurf = pygame.Surface(DISPLAYSURF.get_size())
-    flashSurf = flashSurf.convert_alpha()
+    origSurf = ORIGSURF
+    origSurf.blit(DISPLAYSURF, (0, 0))
+    flashSurf = FLASHSURF
     for start, end, step in ((0, 256, 1), (255, 0, -1)):
         # the first iteration on the outer loop will set the inner loop
         # to have transparency go from 0 to 255, the second iteration will
@@ -294,12 +429,18 @@ def flashBorderAnimation(color, board, animationSpeed=30):
 
 
 def floodAnimation(board, paletteClicked, animationSpeed=25):
-    origBoard = copy.deepcopy(board)
-    floodFill(board, board[0][0], paletteClicked, 0, 0)
+    # Keep a copy of the board image from before the flood, then update
+    # the board image with just the boxes that the flood changed.
+    updateBoardImage(board)
+    origImage = BOARDIMAGE['oldScaled']
+    origImage.blit(BOARDIMAGE['scaled'], (0, 0))
+    changedBoxes = floodFill(board, board[0][0], paletteClicked, 0, 0)
+    updateBoardImage(board, changedBoxes)
 
+    left, top = leftTopPixelCoordOfBox(0, 0)
     for transparency in range(0, 255, animationSpeed):
         # The "new" board slowly become opaque over the original board.
-        drawBoard(origBoard)
+        DISPLAYSURF.blit(origImage, (left, top))
         drawBoard(board, transparency)
         pygame.display.update()
         FPSCLOCK.tick(FPS)
@@ -329,6 +470,15 @@ def generateRandomBoard(width, height, difficulty=MEDIUM):
             boxesToChange = 200
     else:
         boxesToChange = 0
+    makeBoardEasier(board, boxesToChange)
+    return board
+
+
+def makeBoardEasier(board, boxesToChange):
+    # Sets the colors of some boxes to the color of a neighboring box, so
+    # there are fewer, bigger regions of color.
+    width = len(board)
+    height = len(board[0])
 
     # Change neighbor's colors:
     for i in range(boxesToChange):
@@ -339,20 +489,98 @@ def generateRandomBoard(width, height, difficulty=MEDIUM):
         # Randomly choose neighbors to change.
         direction = random.randint(0, 3)
         if direction == 0: # change left and up neighbor
-            board[x-1][y] == board[x][y]
-            board[x][y-1] == board[x][y]
+            board[x-1][y] = board[x][y]
+            board[x][y-1] = board[x][y]
         elif direction == 1: # change right and down neighbor
-            board[x+1][y] == board[x][y]
-            board[x][y+1] == board[x][y]
+            board[x+1][y] = board[x][y]
+            board[x][y+1] = board[x][y]
         elif direction == 2: # change right and up neighbor
-            board[x][y-1] == board[x][y]
-            board[x+1][y] == board[x][y]
+            board[x][y-1] = board[x][y]
+            board[x+1][y] = board[x][y]
         else: # change left and down neighbor
-            board[x][y+1] == board[x][y]
-            board[x-1][y] == board[x][y]
+            board[x][y+1] = board[x][y]
+            board[x-1][y] = board[x][y]
+
+
+def generateSolvableBoard(width, height, difficulty, maxMoves):
+    # Returns a random board that can be won in maxMoves moves or fewer. If
+    # the solver can't win a board in time, some of its boxes are changed
+    # to the color of a neighbor to make it easier, and it is solved again.
+    board = generateRandomBoard(width, height, difficulty)
+    while len(getSolution(getRegionGraph(board))) > maxMoves:
+        makeBoardEasier(board, max(1, int(width * height / 20)))
     return board
 
 
+def getSolution(regionGraph, beamWidth=SOLVERBEAMWIDTH):
+    # Returns a list of the colors to flood with, in order, to win. It
+    # doesn't always find the fewest moves possible, but it comes close.
+    #
+    # This is a "beam search": it tries every color from each of the
+    # beamWidth best positions so far, and keeps the beamWidth best of
+    # those for the next move. A position is better if it has fewer colors
+    # left outside the flooded area, then if its flooded area is bigger.
+    if hasWon(regionGraph):
+        return []
+
+    # Number the regions, so a set of regions can be stored as the bits of
+    # an integer. Bit i is set for region number i.
+    regions = list(regionGraph['color'])
+    regionNums = {}
+    for i in range(len(regions)):
+        regionNums[regions[i]] = i
+    sizes = [regionGraph['size'][region] for region in regions]
+    neighborBits = [] # the regions touching each region
+    colorBits = {} # the regions of each color
+    for i in range(len(regions)):
+        bits = 0
+        for neighbor in regionGraph['neighbors'][regions[i]]:
+            bits |= 1 << regionNums[neighbor]
+        neighborBits.append(bits)
+        color = regionGraph['color'][regions[i]]
+        colorBits[color] = colorBits.get(color, 0) | (1 << i)
+    allBits = (1 << len(regions)) - 1
+
+    # Big boards have lots of regions, so keep fewer positions for them to
+    # keep the solver quick.
+    beamWidth = max(5, min(beamWidth, int(beamWidth * 600 / len(regions))))
+
+    # Each position is a tuple of the flooded regions, the regions touching
+    # them, how many boxes are flooded, and the list of moves to get there.
+    main = regionNums[regionGraph['main']]
+    positions = [(1 << main, neighborBits[main], sizes[main], [])]
+    while True:
+        nextPositions = {}
+        for flooded, border, floodedSize, moves in positions:
+            for color in colorBits:
+                newlyFlooded = border & colorBits[color]
+                if newlyFlooded == 0:
+                    continue # no region of this color touches the flooded area
+                newFlooded = flooded | newlyFlooded
+                if newFlooded == allBits:
+                    return moves + [color]
+                if newFlooded in nextPositions:
+                    continue # already got here with a different order of colors
+
+                # Add the newly flooded regions' neighbors to the border,
+                # going through the regions one bit at a time.
+                newBorder = border
+                newSize = floodedSize
+                bits = newlyFlooded
+                while bits:
+                    lowestBit = bits & -bits
+                    regionNum = lowestBit.bit_length() - 1
+                    newBorder |= neighborBits[regionNum]
+                    newSize += sizes[regionNum]
+                    bits ^= lowestBit
+                nextPositions[newFlooded] = (newFlooded, newBorder & ~newFlooded, newSize, moves + [color])
+
+        def getPositionScore(position):
+            colorsLeft = len([color for color in colorBits if colorBits[color] & ~position[0]])
+            return (-colorsLeft, position[2])
+        positions = sorted(nextPositions.values(), key=getPositionScore, reverse=True)[:beamWidth]
+
+
 def drawLogoAndButtons():
     # draw the Ink Spill logo and Settings and Reset buttons.
     DISPLAYSURF.blit(LOGOIMAGE, (WINDOWWIDTH - LOGOIMAGE.get_width(), 0))
@@ -361,21 +589,38 @@ def drawLogoAndButtons():
 
 
 def drawBoard(board, transparency=255):
-    # The colored squares are drawn to a temporary surface which is then
-    # drawn to the DISPLAYSURF surface. This is done so we can draw the
-    # squares with transparency on top of DISPLAYSURF as it currently is.
-    tempSurf = pygame.Surface(DISPLAYSURF.get_size())
-    tempSurf = tempSurf.convert_alpha()
-    tempSurf.fill((0, 0, 0, 0))
-
-    for x in range(boardWidth):
-        for y in range(boardHeight):
-            left, top = leftTopPixelCoordOfBox(x, y)
-            r, g, b = paletteColors[board[x][y]]
-            pygame.draw.rect(tempSurf, (r, g, b, transparency), (left, top, boxSize, boxSize))
+    # The board image is drawn with transparency on top of DISPLAYSURF as
+    # it currently is.
+    updateBoardImage(board)
+    boardImage = BOARDIMAGE['scaled']
+    boardImage.set_alpha(transparency)
     left, top = leftTopPixelCoordOfBox(0, 0)
-    pygame.draw.rect(tempSurf, BLACK, (left-1, top-1, boxSize * boardWidth + 1, boxSize * boardHeight + 1), 1)
-    DISPLAYSURF.blit(tempSurf, (0, 0))
+    DISPLAYSURF.blit(boardImage, (left, top))
+    pygame.draw.rect(DISPLAYSURF, BLACK, (left-1, top-1, boxSize * boardWidth + 1, boxSize * boardHeight + 1), 1)
+
+
+def updateBoardImage(board, changedBoxes=()):
+    # Draws the boxes in changedBoxes (a list of (x, y) tuples) on the
+    # board image, and scales it up again. If the board, its size or the
+    # colors are different from what the image was drawn for, every box
+    # is drawn.
+    cells = BOARDIMAGE['cells']
+    if BOARDIMAGE['board'] is not board or BOARDIMAGE['palette'] != paletteColors or \
+       BOARDIMAGE['boxSize'] != boxSize or cells.get_size() != (boardWidth, boardHeight):
+        cells = pygame.Surface((boardWidth, boardHeight))
+        BOARDIMAGE['cells'] = cells
+        BOARDIMAGE['scaled'] = pygame.Surface((boardWidth * boxSize, boardHeight * boxSize)).convert()
+        BOARDIMAGE['oldScaled'] = BOARDIMAGE['scaled'].copy()
+        BOARDIMAGE['board'] = board
+        BOARDIMAGE['palette'] = paletteColors
+        BOARDIMAGE['boxSize'] = boxSize
+        changedBoxes = [(x, y) for x in range(boardWidth) for y in range(boardHeight)]
+    elif len(changedBoxes) == 0:
+        return # the image is already up to date
+
+    for x, y in changedBoxes:
+        cells.set_at((x, y), paletteColors[board[x][y]])
+    pygame.transform.scale(cells, BOARDIMAGE['scaled'].get_size(), BOARDIMAGE['scaled'])
 
 
 def drawPalettes():
@@ -398,7 +643,8 @@ def drawLifeMeter(currentLife):
     for i in range(maxLife):
         if currentLife >= (maxLife - i): # draw a solid red box
             pygame.draw.rect(DISPLAYSURF, RED, (20, 20 + (i * lifeBoxSize), 20, lifeBoxSize))
-        pygame.draw.rect(DISPLAYSURF, WHITE, (20, 20 + (i * lifeBoxSize), 20, lifeBoxSize), 1) # draw white outline
+        if lifeBoxSize >= 4: # on big boards the boxes are too thin to have outlines
+            pygame.draw.rect(DISPLAYSURF, WHITE, (20, 20 + (i * lifeBoxSize), 20, lifeBoxSize), 1) # draw white outline
 
 
 def getColorOfPaletteAt(x, y):
@@ -417,21 +663,49 @@ def getColorOfPaletteAt(x, y):
 
 
 def floodFill(board, oldColor, newColor, x, y):
-    # This is the flood fill algorithm.
+    # This is the flood fill algorithm. It fills a whole run of boxes up
+    # and down a column at once, then remembers a box in each run of
+    # oldColor boxes next to it in the columns to the left and right to
+    # fill later. Keeping a list of boxes to fill instead of making a
+    # recursive call for every box means even very big boards don't go
+    # past Python's recursion limit. Returns a list of the (x, y) boxes
+    # that changed color.
+    changedBoxes = []
     if oldColor == newColor or board[x][y] != oldColor:
-        return
-
-    board[x][y] = newColor # change the color of the current box
-
-    # Make the recursive call for any neighboring boxes:
-    if x > 0:
-        floodFill(board, oldColor, newColor, x - 1, y) # on box to the left
-    if x < boardWidth - 1:
-        floodFill(board, oldColor, newColor, x + 1, y) # on box to the right
-    if y > 0:
-        floodFill(board, oldColor, newColor, x, y - 1) # on box to up
-    if y < boardHeight - 1:
-        floodFill(board, oldColor, newColor, x, y + 1) # on box to down
+        return changedBoxes
+
+    boxesToFill = [(x, y)]
+    while boxesToFill:
+        x, y = boxesToFill.pop()
+        column = board[x]
+        if column[y] != oldColor:
+            continue # this run was already filled from another box
+
+        # Find the top and bottom of the run of oldColor boxes.
+        top = y
+        while top > 0 and column[top - 1] == oldColor:
+            top -= 1
+        bottom = y
+        while bottom < boardHeight - 1 and column[bottom + 1] == oldColor:
+            bottom += 1
+        for runy in range(top, bottom + 1):
+            column[runy] = newColor
+            changedBoxes.append((x, runy))
+
+        # Remember one box from each run of oldColor boxes beside this run.
+        for nextx in (x - 1, x + 1):
+            if nextx < 0 or nextx >= boardWidth:
+                continue
+            nextColumn = board[nextx]
+            inRun = False
+            for runy in range(top, bottom + 1):
+                if nextColumn[runy] == oldColor:
+                    if not inRun:
+                        boxesToFill.append((nextx, runy))
+                    inRun = True
+                else:
+                    inRun = False
+    return changedBoxes
 
 
 def leftTopPixelCoordOfBox(boxx, boxy):
@@ -3,7 +3,7 @@
 # http://inventwithpython.com/pygame
 # Released under a "Simplified BSD" license
 
-import pygame, sys, random
+import pygame, sys, os, random, heapq, struct, mmap
 from pygame.locals import *
 
 # Create the constants (go ahead and experiment with different values)
@@ -14,6 +14,11 @@ WINDOWWIDTH = 640
 WINDOWHEIGHT = 480
 FPS = 30
 BLANK = None
+SOLVERNODES = 50000 # how many positions the solver looks at to find the fewest moves before it settles for a few more
+SOLVERWEIGHT = 1.5 # how much the fallback search trusts its guess of the moves left; higher is faster but finds longer solutions
+PATTERNFILE = 'assets/data/slidepuzzle_patterns_%sx%s.bin' # pattern database made by slidepuzzle_makepatterns.py for each board size, or None
+PUZZLEDIFFICULTY = None # how many moves the shortest solution of a new puzzle takes, or None for a completely random puzzle
+SCRAMBLEFRAMES = 15 # how many frames the tiles take to move into a new puzzle, or 0 to not show it
 
 #                 R    G    B
 BLACK =         (  0,   0,   0)
@@ -39,6 +44,19 @@ UP = 'up'
 DOWN = 'down'
 LEFT = 'left'
 RIGHT = 'right'
+OPPOSITEMOVES = {UP: DOWN, DOWN: UP, LEFT: RIGHT, RIGHT: LEFT}
+
+# The pattern database splits the tiles into groups, and holds how many
+# moves of a group's own tiles it takes to get them all to where they
+# belong, for every place the group's tiles could be. Only the group's
+# tiles are counted, so the moves for each group can be added together and
+# still never be more than the real number of moves. The file is a header
+# followed by one table per group, with a byte for each place the tiles
+# could be. It's memory-mapped the first time the solver runs on each size
+# of board.
+PATTERNHEADER = struct.Struct('>4sBBB') # 'SPDB', BOARDWIDTH, BOARDHEIGHT, tiles in each group
+PATTERNENTRIES = 2 ** 20 # the most entries in a group's table, which decides how many tiles a group has
+PATTERNDATABASES = {} # (BOARDWIDTH, BOARDHEIGHT) -> the memory-mapped file, or None if there isn't one
 
 def main():
     global FPSCLOCK, DISPLAYSURF, BASICFONT, RESET_SURF, RESET_RECT, NEW_SURF, NEW_RECT, SOLVE_SURF, SOLVE_RECT
@@ -54,9 +72,9 @@ def main():
     NEW_SURF,   NEW_RECT   = makeText('New Game', TEXTCOLOR, TILECOLOR, WINDOWWIDTH - 120, WINDOWHEIGHT - 60)
     SOLVE_SURF, SOLVE_RECT = makeText('Solve',    TEXTCOLOR, TILECOLOR, WINDOWWIDTH - 120, WINDOWHEIGHT - 30)
 
-    mainBoard, solutionSeq = generateNewPuzzle(80)
+    mainBoard = generateNewPuzzle(PUZZLEDIFFICULTY)
+    startBoard = copyBoard(mainBoard) # the board the puzzle started as, for the Reset button
     SOLVEDBOARD = getStartingBoard() # a solved board is the same as the board in a start state.
-    allMoves = [] # list of moves made from the solved configuration
 
     while True: # main game loop
         slideTo = None # the direction, if any, a tile should slide
@@ -74,14 +92,18 @@ def main():
                 if (spotx, spoty) == (None, None):
                     # check if the user clicked on an option button
                     if RESET_RECT.collidepoint(event.pos):
-                        resetAnimation(mainBoard, allMoves) # clicked on Reset button
-                        allMoves = []
+                        resetAnimation(mainBoard, startBoard) # clicked on Reset button
                     elif NEW_RECT.collidepoint(event.pos):
-                        mainBoard, solutionSeq = generateNewPuzzle(80) # clicked on New Game button
-                        allMoves = []
+                        mainBoard = generateNewPuzzle(PUZZLEDIFFICULTY) # clicked on New Game button
+                        startBoard = copyBoard(mainBoard)
                     elif SOLVE_RECT.collidepoint(event.pos):
-                        resetAnimation(mainBoard, solutionSeq + allMoves) # clicked on Solve button
-                        allMoves = []
+                        # clicked on Solve button
+                        drawBoard(mainBoard, 'Solving...')
+                        pygame.display.update()
+                        for move in getSolvingMoves(mainBoard):
+                            slideAnimation(mainBoard, move, 'Solving...', animationSpeed=int(TILESIZE / 2))
+                            makeMove(mainBoard, move)
+                        startBoard = copyBoard(mainBoard)
                 else:
                     # check if the clicked tile was next to the blank spot
 
@@ -109,7 +131,6 @@ def main():
         if slideTo:
             slideAnimation(mainBoard, slideTo, 'Click tile or press arrow keys to slide.', 8) # show slide on screen
             makeMove(mainBoard, slideTo)
-            allMoves.append(slideTo) # record the slide
         pygame.display.update()
         FPSCLOCK.tick(FPS)
 
@@ -292,41 +313,500 @@ def slideAnimation(board, direction, message, animationSpeed):
         FPSCLOCK.tick(FPS)
 
 
-def generateNewPuzzle(numSlides):
-    # From a starting configuration, make numSlides number of moves (and
-    # animate these moves).
-    sequence = []
+def generateNewPuzzle(difficulty=None):
+    # Returns a new puzzle board (see getRandomBoard()), and shows the
+    # tiles moving from the solved board into it.
     board = getStartingBoard()
-    drawBoard(board, '')
-    pygame.display.update()
-    pygame.time.wait(500) # pause 500 milliseconds for effect
+    newBoard = getRandomBoard(difficulty)
+    if SCRAMBLEFRAMES > 0:
+        drawBoard(board, '')
+        pygame.display.update()
+        pygame.time.wait(500) # pause 500 milliseconds for effect
+        scrambleAnimation(board, newBoard, 'Generating new puzzle...')
+    return newBoard
+
+
+def getRandomBoard(difficulty=None):
+    # Returns a random board that can be solved. If difficulty is None,
+    # every solvable board is equally likely. Otherwise, the board's
+    # shortest solution is difficulty moves long, as near as the solver
+    # can manage quickly (for the very hardest boards it may be off).
+    goalTiles = getPackedBoard(getStartingBoard())
+    if difficulty == None:
+        # Shuffle the tiles. Half of all shuffles can't be solved, but
+        # swapping two tiles turns each of those into a different one that
+        # can, so every solvable board is still equally likely.
+        tiles = list(goalTiles)
+        random.shuffle(tiles)
+        if not isSolvable(tiles, goalTiles):
+            first, second = [i for i in range(len(tiles)) if tiles[i] != 0][:2]
+            tiles[first], tiles[second] = tiles[second], tiles[first]
+        return getUnpackedBoard(tiles)
+
+    # Make random slides until the heuristic says it takes at least
+    # difficulty moves to solve. Slides that make the heuristic bigger are
+    # picked when there are any, so the board gets harder quickly. (Give up
+    # after 1000 slides, if that's more than the board can take.)
+    board = getStartingBoard()
+    goalX, goalY = getGoalSpots(goalTiles)
+    patterns = getPatternDatabase()
+    heuristic = 0
     lastMove = None
-    for i in range(numSlides):
-        move = getRandomMove(board, lastMove)
-        slideAnimation(board, move, 'Generating new puzzle...', animationSpeed=int(TILESIZE / 3))
+    for i in range(1000):
+        harderMoves = []
+        for move in (UP, DOWN, LEFT, RIGHT):
+            if isValidMove(board, move) and move != OPPOSITEMOVES.get(lastMove):
+                makeMove(board, move)
+                if getHeuristic(getPackedBoard(board), goalX, goalY, patterns) > heuristic:
+                    harderMoves.append(move)
+                makeMove(board, OPPOSITEMOVES[move]) # slide it back
+        if harderMoves:
+            lastMove = random.choice(harderMoves)
+        else:
+            lastMove = getRandomMove(board, lastMove)
+        makeMove(board, lastMove)
+        heuristic = getHeuristic(getPackedBoard(board), goalX, goalY, patterns)
+        if heuristic >= difficulty:
+            break
+
+    # The heuristic is never more than the real number of moves, so now the
+    # shortest solution is at least difficulty moves. Make the first moves
+    # of it, until there are exactly difficulty moves left. This only
+    # happens once per puzzle, so the solver can look harder than usual.
+    moves = getIDAStarMoves(getPackedBoard(board), goalX, goalY, 4 * SOLVERNODES, patterns)
+    if moves != None:
+        for move in moves[:max(0, len(moves) - difficulty)]:
+            makeMove(board, move)
+    return board
+
+
+def scrambleAnimation(fromBoard, toBoard, message):
+    # Slides every tile at once, straight from where it is on fromBoard to
+    # where it is on toBoard, over SCRAMBLEFRAMES frames.
+    fromSpots = {}
+    for tilex in range(BOARDWIDTH):
+        for tiley in range(BOARDHEIGHT):
+            fromSpots[fromBoard[tilex][tiley]] = (tilex, tiley)
+    emptyBoard = [[BLANK] * BOARDHEIGHT for x in range(BOARDWIDTH)]
+
+    for frame in range(1, SCRAMBLEFRAMES + 1):
+        checkForQuit()
+        drawBoard(emptyBoard, message)
+        for tilex in range(BOARDWIDTH):
+            for tiley in range(BOARDHEIGHT):
+                if toBoard[tilex][tiley] == BLANK:
+                    continue
+                fromx, fromy = fromSpots[toBoard[tilex][tiley]]
+                fromLeft, fromTop = getLeftTopOfTile(fromx, fromy)
+                toLeft, toTop = getLeftTopOfTile(tilex, tiley)
+                drawTile(fromx, fromy, toBoard[tilex][tiley], int((toLeft - fromLeft) * frame / SCRAMBLEFRAMES),
+                         int((toTop - fromTop) * frame / SCRAMBLEFRAMES))
+        pygame.display.update()
+        FPSCLOCK.tick(FPS)
+
+
+def copyBoard(board):
+    return [column[:] for column in board]
+
+
+def resetAnimation(board, startBoard):
+    # Slides the tiles back to where they were on startBoard, with the
+    # moves the solver finds.
+    for move in getSolvingMoves(board, startBoard):
+        slideAnimation(board, move, '', animationSpeed=int(TILESIZE / 2))
         makeMove(board, move)
-        sequence.append(move)
-        lastMove = move
-    return (board, sequence)
 
 
-def resetAnimation(board, allMoves):
-    # make all of the moves in allMoves in reverse.
-    revAllMoves = allMoves[:] # gets a copy of the list
-    revAllMoves.reverse()
+def getSolvingMoves(board, goalBoard=None, maxNodes=SOLVERNODES):
+    # Returns a list of moves that slide the tiles on board into the same
+    # places as on goalBoard (the solved board if goalBoard is None). It
+    # searches for the fewest moves with IDA*, but if that looks at more
+    # than maxNodes positions, it uses a weighted search instead which is
+    # much faster but can find a solution with a few more moves. If even
+    # that takes too long, the weighted search is tried again trusting the
+    # heuristic more each time.
+    if goalBoard == None:
+        goalBoard = getStartingBoard()
+    tiles = getPackedBoard(board)
+    goalTiles = getPackedBoard(goalBoard)
+    if sorted(tiles) != sorted(goalTiles) or not isSolvable(tiles, goalTiles):
+        return None # the tiles can't be slid into the goal places
+    if tiles == goalTiles:
+        return []
+
+    goalX, goalY = getGoalSpots(goalTiles)
+    # The pattern database only knows the way to the solved board.
+    patterns = None
+    if goalTiles == getPackedBoard(getStartingBoard()):
+        patterns = getPatternDatabase()
+    moves = getIDAStarMoves(tiles, goalX, goalY, maxNodes, patterns)
+    weight = SOLVERWEIGHT
+    while moves == None:
+        moves = getWeightedMoves(tiles, goalTiles, goalX, goalY, weight, maxNodes, patterns)
+        weight += 1
+    return moves
+
+
+def getPackedBoard(board):
+    # Returns the board as a tuple of tile numbers, going across each row
+    # from the top row to the bottom row, with 0 for the blank space.
+    # Tuples are smaller and quicker to compare and copy than the board's
+    # list of lists.
+    tiles = []
+    for y in range(BOARDHEIGHT):
+        for x in range(BOARDWIDTH):
+            if board[x][y] == BLANK:
+                tiles.append(0)
+            else:
+                tiles.append(board[x][y])
+    return tuple(tiles)
+
+
+def getUnpackedBoard(tiles):
+    # Returns the board data structure for the packed tiles.
+    board = []
+    for x in range(BOARDWIDTH):
+        column = []
+        for y in range(BOARDHEIGHT):
+            if tiles[y * BOARDWIDTH + x] == 0:
+                column.append(BLANK)
+            else:
+                column.append(tiles[y * BOARDWIDTH + x])
+        board.append(column)
+    return board
+
 
-    for move in revAllMoves:
-        if move == UP:
-            oppositeMove = DOWN
-        elif move == DOWN:
-            oppositeMove = UP
-        elif move == RIGHT:
-            oppositeMove = LEFT
-        elif move == LEFT:
-            oppositeMove = RIGHT
-        slideAnimation(board, oppositeMove, '', animationSpeed=int(TILESIZE / 2))
-        makeMove(board, oppositeMove)
+def getGoalSpots(goalTiles):
+    # Returns two lists, goalX and goalY, of where each tile number
+    # belongs on the packed goalTiles.
+    goalX = [0] * len(goalTiles)
+    goalY = [0] * len(goalTiles)
+    for i in range(len(goalTiles)):
+        goalX[goalTiles[i]] = i % BOARDWIDTH
+        goalY[goalTiles[i]] = i // BOARDWIDTH
+    return goalX, goalY
+
+
+def isSolvable(tiles, goalTiles):
+    # Returns True if the packed tiles can be slid into the same places as
+    # goalTiles. Every slide swaps the blank with a tile and moves the
+    # blank one space, so the number of swaps needed to turn one into the
+    # other and how far the blank is from its goal space must both be even
+    # or both be odd.
+    goalSpots = {}
+    for i in range(len(goalTiles)):
+        goalSpots[goalTiles[i]] = i
+    swaps = 0
+    checked = [False] * len(tiles)
+    for i in range(len(tiles)):
+        # Follow each cycle of tiles that are in each other's places. A
+        # cycle of n tiles takes n - 1 swaps to put right.
+        spot = i
+        while not checked[spot]:
+            checked[spot] = True
+            spot = goalSpots[tiles[spot]]
+            if not checked[spot]:
+                swaps += 1
+    blank = tiles.index(0)
+    goalBlank = goalTiles.index(0)
+    blankDistance = abs(blank % BOARDWIDTH - goalBlank % BOARDWIDTH) + abs(blank // BOARDWIDTH - goalBlank // BOARDWIDTH)
+    return (swaps + blankDistance) % 2 == 0
+
+
+def getBlankSlides():
+    # Returns a list with, for each space on the packed board, a list of
+    # (space the blank moves to, move) tuples for the moves that can be
+    # made when the blank is there. The move is the direction the tile
+    # slides, which is the opposite of the way the blank goes.
+    blankSlides = []
+    for i in range(BOARDWIDTH * BOARDHEIGHT):
+        x = i % BOARDWIDTH
+        y = i // BOARDWIDTH
+        slides = []
+        if y < BOARDHEIGHT - 1:
+            slides.append((i + BOARDWIDTH, UP))
+        if y > 0:
+            slides.append((i - BOARDWIDTH, DOWN))
+        if x < BOARDWIDTH - 1:
+            slides.append((i + 1, LEFT))
+        if x > 0:
+            slides.append((i - 1, RIGHT))
+        blankSlides.append(slides)
+    return blankSlides
+
+
+def getLineConflicts(goalSpots, cache={}):
+    # goalSpots is a tuple of where the tiles in a row (or column) that
+    # belong in that row go, in the order they are in now. Two tiles in
+    # the wrong order must get past each other, which takes 2 more moves
+    # than the Manhattan distance counts. Returns how many tiles have to
+    # get out of the way, which is the number of tiles that aren't in the
+    # longest run of tiles that are already in order.
+    if goalSpots not in cache:
+        longest = [1] * len(goalSpots) # the longest in-order run ending at each tile
+        for i in range(len(goalSpots)):
+            for j in range(i):
+                if goalSpots[j] < goalSpots[i] and longest[j] + 1 > longest[i]:
+                    longest[i] = longest[j] + 1
+        cache[goalSpots] = len(goalSpots) - max(longest + [0])
+    return cache[goalSpots]
+
+
+def getRowConflicts(tiles, y, goalX, goalY):
+    # Returns the linear conflicts of the tiles in row y.
+    row = tiles[y * BOARDWIDTH:(y + 1) * BOARDWIDTH]
+    return getLineConflicts(tuple([goalX[tile] for tile in row if tile != 0 and goalY[tile] == y]))
+
+
+def getColumnConflicts(tiles, x, goalX, goalY):
+    # Returns the linear conflicts of the tiles in column x.
+    column = tiles[x::BOARDWIDTH]
+    return getLineConflicts(tuple([goalY[tile] for tile in column if tile != 0 and goalX[tile] == x]))
+
+
+def getHeuristic(tiles, goalX, goalY, patterns=None):
+    # Returns a guess of how many moves it takes to solve the tiles, which
+    # is never more than it really takes: the Manhattan distance (how many
+    # spaces each tile is from where it belongs) plus 2 for each tile that
+    # has to get out of the way of another tile in its row or column, or
+    # the pattern database's moves if that is more.
+    if patterns != None:
+        return max(getHeuristic(tiles, goalX, goalY), getPatternDistance(tiles, patterns))
+    distance = 0
+    for i in range(len(tiles)):
+        if tiles[i] != 0:
+            distance += abs(i % BOARDWIDTH - goalX[tiles[i]]) + abs(i // BOARDWIDTH - goalY[tiles[i]])
+    for y in range(BOARDHEIGHT):
+        distance += 2 * getRowConflicts(tiles, y, goalX, goalY)
+    for x in range(BOARDWIDTH):
+        distance += 2 * getColumnConflicts(tiles, x, goalX, goalY)
+    return distance
+
+
+def getPatternGroups(cache={}):
+    # Returns a list of the groups of tiles in the pattern database, as
+    # tuples of tile numbers. Each group has as many tiles as fit in
+    # PATTERNENTRIES entries, e.g. 5, 5 and 5 tiles on a 4x4 board.
+    spaces = BOARDWIDTH * BOARDHEIGHT
+    if spaces not in cache:
+        groupSize = 1
+        while spaces ** (groupSize + 1) <= PATTERNENTRIES:
+            groupSize += 1
+        tileNums = list(range(1, spaces))
+        cache[spaces] = [tuple(tileNums[i:i + groupSize]) for i in range(0, len(tileNums), groupSize)]
+    return cache[spaces]
+
+
+def getPatternPlace(spots):
+    # Returns the entry number in a group's table for the group's tiles
+    # being on these spaces of the packed board (in the group's order). The
+    # entry number is the spaces as the digits of a number in base
+    # BOARDWIDTH * BOARDHEIGHT, so moving one tile just adds to it.
+    place = 0
+    for spot in spots:
+        place = place * BOARDWIDTH * BOARDHEIGHT + spot
+    return place
+
+
+def getPatternPlaces(tiles):
+    # Returns a list of each group's entry number for the packed tiles.
+    spotOfTile = [0] * len(tiles)
+    for i in range(len(tiles)):
+        spotOfTile[tiles[i]] = i
+    return [getPatternPlace([spotOfTile[tile] for tile in group]) for group in getPatternGroups()]
+
+
+def getPatternTileInfo():
+    # Returns two dictionaries: the group number of each tile, and how much
+    # its group's entry number changes when the tile moves one space right.
+    groupOfTile = {}
+    radixOfTile = {}
+    groups = getPatternGroups()
+    for groupNum in range(len(groups)):
+        group = groups[groupNum]
+        for i in range(len(group)):
+            groupOfTile[group[i]] = groupNum
+            radixOfTile[group[i]] = (BOARDWIDTH * BOARDHEIGHT) ** (len(group) - 1 - i)
+    return groupOfTile, radixOfTile
+
+
+def getPatternOffsets(cache={}):
+    # Returns a list of where each group's table starts in the file.
+    spaces = BOARDWIDTH * BOARDHEIGHT
+    if spaces not in cache:
+        cache[spaces] = []
+        offset = PATTERNHEADER.size
+        for group in getPatternGroups():
+            cache[spaces].append(offset)
+            offset += spaces ** len(group)
+    return cache[spaces]
+
+
+def getPatternDistance(tiles, patterns):
+    # Returns the pattern database's moves for the packed tiles: the sum of
+    # each group's moves.
+    offsets = getPatternOffsets()
+    places = getPatternPlaces(tiles)
+    return sum([patterns[offsets[i] + places[i]] for i in range(len(places))])
+
+
+def getPatternDatabase():
+    # Returns the memory-mapped pattern database for this size of board, or
+    # None if there isn't one. It's only looked for once per size.
+    size = (BOARDWIDTH, BOARDHEIGHT)
+    if size in PATTERNDATABASES:
+        return PATTERNDATABASES[size]
+    PATTERNDATABASES[size] = None
+    if PATTERNFILE == None:
+        return None
+    filename = PATTERNFILE % size
+    groups = getPatternGroups()
+    fileSize = getPatternOffsets()[-1] + (BOARDWIDTH * BOARDHEIGHT) ** len(groups[-1])
+    if not os.path.exists(filename) or os.path.getsize(filename) != fileSize:
+        return None
+    with open(filename, 'rb') as patternFile:
+        data = mmap.mmap(patternFile.fileno(), 0, access=mmap.ACCESS_READ)
+    if PATTERNHEADER.unpack_from(data, 0) != (b'SPDB', BOARDWIDTH, BOARDHEIGHT, len(groups[0])):
+        data.close()
+        return None
+    PATTERNDATABASES[size] = data
+    return data
+
+
+def getIDAStarMoves(tiles, goalX, goalY, maxNodes, patterns=None):
+    # Returns the fewest moves that solve the tiles using IDA*: a depth
+    # first search that gives up on any path where the moves so far plus
+    # the heuristic are more than a bound, starting with the bound at the
+    # heuristic of the start and raising it each time no solution is found.
+    # Returns None if it looks at more than maxNodes positions. With a
+    # pattern database, patterns is the memory-mapped file.
+    tiles = list(tiles)
+    blankSlides = getBlankSlides()
+    rowConflicts = [getRowConflicts(tiles, y, goalX, goalY) for y in range(BOARDHEIGHT)]
+    columnConflicts = [getColumnConflicts(tiles, x, goalX, goalY) for x in range(BOARDWIDTH)]
+    moves = []
+    nodes = [0]
+
+    # Each group's place in the pattern database is kept up to date as
+    # tiles slide, so looking up its moves doesn't need the whole board.
+    patternPlaces = []
+    if patterns != None:
+        patternPlaces = getPatternPlaces(tiles)
+        groupOfTile, radixOfTile = getPatternTileInfo()
+        groupOffsets = getPatternOffsets()
+
+    def search(blank, distance, patternDistance, bound, lastMove):
+        # Returns True if a solution is found within the bound (and leaves
+        # it in moves), otherwise the smallest bound that went over.
+        estimate = len(moves) + max(distance, patternDistance)
+        if estimate > bound:
+            return estimate
+        if distance == 0:
+            return True
+        nodes[0] += 1
+        if nodes[0] > maxNodes:
+            return None
+        smallestOver = None
+        for newBlank, move in blankSlides[blank]:
+            if move == OPPOSITEMOVES.get(lastMove):
+                continue # don't undo the last move
+            tile = tiles[newBlank]
+            tiles[blank] = tile
+            tiles[newBlank] = 0
+
+            # Only the moved tile's distance and the conflicts of the rows
+            # or columns it left and entered change.
+            oldx, oldy = newBlank % BOARDWIDTH, newBlank // BOARDWIDTH
+            newx, newy = blank % BOARDWIDTH, blank // BOARDWIDTH
+            change = abs(newx - goalX[tile]) + abs(newy - goalY[tile]) - abs(oldx - goalX[tile]) - abs(oldy - goalY[tile])
+            if oldx == newx: # the tile moved up or down, changing rows
+                lines, getConflicts, oldLine, newLine = rowConflicts, getRowConflicts, oldy, newy
+            else: # the tile moved left or right, changing columns
+                lines, getConflicts, oldLine, newLine = columnConflicts, getColumnConflicts, oldx, newx
+            oldConflicts = (lines[oldLine], lines[newLine])
+            lines[oldLine] = getConflicts(tiles, oldLine, goalX, goalY)
+            lines[newLine] = getConflicts(tiles, newLine, goalX, goalY)
+            change += 2 * (lines[oldLine] + lines[newLine] - oldConflicts[0] - oldConflicts[1])
+
+            # Only the moved tile's group changes its place in the pattern
+            # database.
+            patternChange = 0
+            if patternPlaces:
+                group = groupOfTile[tile]
+                oldPlace = patternPlaces[group]
+                patternPlaces[group] = oldPlace + (blank - newBlank) * radixOfTile[tile]
+                patternChange = patterns[groupOffsets[group] + patternPlaces[group]] - patterns[groupOffsets[group] + oldPlace]
+
+            moves.append(move)
+            result = search(newBlank, distance + change, patternDistance + patternChange, bound, move)
+            if result == True:
+                return True
+            moves.pop()
+            if patternPlaces:
+                patternPlaces[group] = oldPlace
+            lines[oldLine], lines[newLine] = oldConflicts
+            tiles[newBlank] = tile
+            tiles[blank] = 0
+            if result == None:
+                return None
+            if smallestOver == None or result < smallestOver:
+                smallestOver = result
+        return smallestOver
+
+    distance = getHeuristic(tiles, goalX, goalY)
+    patternDistance = 0
+    if patterns != None:
+        patternDistance = getPatternDistance(tiles, patterns)
+    bound = max(distance, patternDistance)
+    while True:
+        result = search(tiles.index(0), distance, patternDistance, bound, None)
+        if result == True:
+            return moves
+        if result == None:
+            return None
+        bound = result
+
+
+def getWeightedMoves(tiles, goalTiles, goalX, goalY, weight, maxNodes, patterns=None):
+    # Returns moves that solve the tiles using weighted A*: it always looks
+    # next at the position with the smallest moves so far plus weight times
+    # the heuristic. Trusting the heuristic more than the moves so far
+    # finds a solution much faster, but it may not be the shortest one.
+    # Returns None if it looks at more than maxNodes positions.
+    blankSlides = getBlankSlides()
+    cameFrom = {tiles: None} # position -> (previous position, move)
+    movesTo = {tiles: 0}
+    positions = [(weight * getHeuristic(tiles, goalX, goalY, patterns), 0, tiles)]
+    nodes = 0
+    while positions:
+        estimate, movesSoFar, position = heapq.heappop(positions)
+        if position == goalTiles:
+            break
+        if movesSoFar > movesTo[position]:
+            continue # this position was reached with fewer moves since
+        nodes += 1
+        if nodes > maxNodes:
+            return None
+        blank = position.index(0)
+        for newBlank, move in blankSlides[blank]:
+            newPosition = list(position)
+            newPosition[blank] = newPosition[newBlank]
+            newPosition[newBlank] = 0
+            newPosition = tuple(newPosition)
+            if newPosition not in movesTo or movesSoFar + 1 < movesTo[newPosition]:
+                movesTo[newPosition] = movesSoFar + 1
+                cameFrom[newPosition] = (position, move)
+                heapq.heappush(positions, (movesSoFar + 1 + weight * getHeuristic(newPosition, goalX, goalY, patterns), movesSoFar + 1, newPosition))
+
+    # Follow cameFrom back from the goal to get the moves.
+    moves = []
+    position = goalTiles
+    while cameFrom[position] != None:
+        position, move = cameFrom[position]
+        moves.append(move)
+    moves.reverse()
+    return moves
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
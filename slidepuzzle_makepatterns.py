@@ -0,0 +1,113 @@
+# Slide Puzzle pattern database maker
+# Works out, for each group of tiles and every place those tiles could be,
+# the fewest moves of the group's own tiles it takes to slide them all to
+# where they belong, and writes it to the pattern database file that
+# slidepuzzle.py's solver reads. Each group is searched in its own process.
+# This only needs to be done once for each board size.
+#
+# Usage: python slidepuzzle_makepatterns.py [--width 4] [--height 4] [--processes 3]
+
+import argparse, collections, multiprocessing, os, time
+import slidepuzzle
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Make the Slide Puzzle pattern database.')
+    parser.add_argument('--width', type=int, default=slidepuzzle.BOARDWIDTH, help='number of columns in the board')
+    parser.add_argument('--height', type=int, default=slidepuzzle.BOARDHEIGHT, help='number of rows in the board')
+    parser.add_argument('--processes', type=int, default=multiprocessing.cpu_count(), help='how many groups to search at once')
+    parser.add_argument('--output', default=None, help='the pattern database file to write')
+    args = parser.parse_args()
+
+    setBoardSize(args.width, args.height)
+    filename = args.output
+    if filename == None:
+        filename = slidepuzzle.PATTERNFILE % (args.width, args.height)
+    groups = slidepuzzle.getPatternGroups()
+    print('Searching %s groups of tiles on a %sx%s board with %s processes...' % (len(groups), args.width, args.height, args.processes))
+    startTime = time.time()
+    pool = multiprocessing.Pool(args.processes)
+    tables = pool.map(searchGroup, [(args.width, args.height, group) for group in groups], chunksize=1)
+    pool.close()
+    pool.join()
+
+    writePatterns(filename, groups, tables)
+    print('Wrote %s to %s in %.1f seconds.' % (', '.join(['%s tiles' % (len(group)) for group in groups]), filename, time.time() - startTime))
+
+
+def setBoardSize(width, height):
+    # The slidepuzzle functions use the board size constants, so set them
+    # (in this process or a worker).
+    slidepuzzle.BOARDWIDTH = width
+    slidepuzzle.BOARDHEIGHT = height
+
+
+def searchGroup(task):
+    # Runs in a worker process. Returns the group's table: a byte for each
+    # place its tiles could be, with the fewest moves of the group's tiles
+    # to get them where they belong. Moving any other tile is free, so the
+    # blank can go anywhere it can reach without passing a group tile.
+    #
+    # This is a breadth-first search out from the solved places, where a
+    # position is the group's place and the blank's space. Free moves go on
+    # the front of the queue and moves of a group tile go on the back, so
+    # positions come off the queue in order of how many group moves they
+    # took. A place's entry is its fewest moves with the blank on any space.
+    # Places where two tiles would be on the same space can't happen and are
+    # left at 255.
+    width, height, group = task
+    setBoardSize(width, height)
+    spaces = width * height
+    neighbors = []
+    for spot in range(spaces):
+        x = spot % width
+        y = spot // width
+        neighbors.append([nextSpot for nextSpot, nextx, nexty in ((spot - width, x, y - 1), (spot + width, x, y + 1),
+                                                                 (spot - 1, x - 1, y), (spot + 1, x + 1, y))
+                          if 0 <= nextx < width and 0 <= nexty < height])
+    radixes = [spaces ** (len(group) - 1 - i) for i in range(len(group))]
+
+    table = bytearray([255]) * (spaces ** len(group))
+    seen = bytearray(spaces ** (len(group) + 1)) # 1 for each (place, blank) position already searched
+    start = slidepuzzle.getPatternPlace([tile - 1 for tile in group]) # tile n belongs on space n - 1
+    positions = collections.deque([(start, spaces - 1, 0)]) # the blank belongs on the last space
+    while positions:
+        place, blank, moves = positions.popleft()
+        if seen[place * spaces + blank]:
+            continue # already reached with as few moves
+        seen[place * spaces + blank] = 1
+        if moves < table[place]:
+            table[place] = moves
+
+        # Turn the place back into the spaces the tiles are on.
+        spots = []
+        rest = place
+        for i in range(len(group)):
+            rest, spot = divmod(rest, spaces)
+            spots.append(spot)
+        spots.reverse()
+
+        for nextBlank in neighbors[blank]:
+            if nextBlank in spots:
+                # A group tile slides into the blank's space.
+                i = spots.index(nextBlank)
+                nextPlace = place + (blank - nextBlank) * radixes[i]
+                if not seen[nextPlace * spaces + nextBlank]:
+                    positions.append((nextPlace, nextBlank, moves + 1))
+            elif not seen[place * spaces + nextBlank]:
+                positions.appendleft((place, nextBlank, moves)) # another tile slides, which is free
+    return bytes(table)
+
+
+def writePatterns(filename, groups, tables):
+    # Writes the header and then each group's table.
+    if os.path.dirname(filename) and not os.path.isdir(os.path.dirname(filename)):
+        os.makedirs(os.path.dirname(filename))
+    with open(filename, 'wb') as patternFile:
+        patternFile.write(slidepuzzle.PATTERNHEADER.pack(b'SPDB', slidepuzzle.BOARDWIDTH, slidepuzzle.BOARDHEIGHT, len(groups[0])))
+        for table in tables:
+            patternFile.write(table)
+
+
+if __name__ == '__main__':
+    main()